@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from dex_schema import Pair, decode_pairs
+from dex_standin import generate_pair
+from searchDex import ImprovedTokenSearcher
+from yt import YoutubeMemeChecker
+
+WORDS = ['grumpy', 'Cat', 'distracted', 'Boyfriend', 'doge', 'moon', 'Pepe', 'stonks', 'this', 'is',
+         'fine', 'Harambe', 'rickroll', 'baby', 'shark', 'elon', 'Wojak', 'coffin', 'dance', 'Nyan']
+TITLE_WORDS = WORDS + ['#shorts', '#tiktok', 'tt', 'ig', '#reels', 'x.com', 'compilation', 'funny']
+
+
+def make_memes(rng: random.Random, n: int) -> List[Dict]:
+    """Seeded KYM-shaped entries."""
+    now = datetime.utcnow()
+    return [{
+        'name': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))),
+        'tags': [' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 2))) for _ in range(rng.randint(0, 6))],
+        'list_tags': [rng.choice(WORDS) for _ in range(rng.randint(0, 3))],
+        'added': (now - timedelta(days=rng.randint(0, 900))).strftime('%Y-%m-%d'),
+        'views': rng.randint(0, 10 ** 7)
+    } for _ in range(n)]
+
+
+def make_pairs(rng: random.Random, n: int) -> List[Pair]:
+    """Seeded DexScreener-shaped pairs, decoded the way search_dexscreener returns them."""
+    return decode_pairs(json.dumps({'pairs': [generate_pair(rng, index=i) for i in range(n)]}).encode('utf-8'))
+
+
+def make_videos(rng: random.Random, n: int) -> List[Dict]:
+    """Seeded YouTube video lists as returned by search_youtube."""
+    now = datetime.utcnow()
+    return [{
+        'video_id': f"vid{i:06d}",
+        'title': ' '.join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(2, 10))),
+        'views': rng.randint(0, 5 * 10 ** 6),
+        'likes': rng.randint(0, 10 ** 5),
+        'comments': rng.randint(0, 10 ** 4),
+        'published_at': (now - timedelta(seconds=rng.randint(0, 365 * 86400))).strftime('%Y-%m-%dT%H:%M:%SZ')
+    } for i in range(n)]
+
+
+def build_cases(searcher: ImprovedTokenSearcher, checker: YoutubeMemeChecker,
+                size: int, seed: int) -> Dict[str, Callable[[], None]]:
+    """One callable per hot path, each processing `size` synthetic inputs."""
+    rng = random.Random(seed + size)
+    memes = make_memes(rng, size)
+    pairs = make_pairs(rng, size)
+    videos = make_videos(rng, size)
+    names = [meme['name'] for meme in memes]
+    tokens = [(p.baseToken.name, p.baseToken.symbol) for p in pairs]
+    terms = [rng.choice(WORDS).lower() for _ in range(size)]
+
+    return {
+        'extract_meaningful_phrases': lambda: [searcher.extract_meaningful_phrases(name) for name in names],
+        'is_spam_term': lambda: [searcher.is_spam_term(name) for name in names],
+        'is_spam_token': lambda: [searcher.is_spam_token(name, symbol) for name, symbol in tokens],
+        'calculate_match_score': lambda: [searcher.calculate_match_score(name, symbol, term, 2.0)
+                                          for (name, symbol), term in zip(tokens, terms)],
+        'analyze_market_metrics': lambda: [searcher.analyze_market_metrics(pair) for pair in pairs],
+        'analyze_temporal_relevance': lambda: [searcher.analyze_temporal_relevance(pair, meme)
+                                               for pair, meme in zip(pairs, memes)],
+        'analyze_virality': lambda: checker.analyze_virality(videos),
+        'analyze_video_timeline': lambda: checker.analyze_video_timeline(videos)
+    }
+
+
+def time_case(fn: Callable[[], None], min_time: float = 0.2, repeats: int = 5) -> float:
+    """Best-of-`repeats` seconds per call, looping each repeat for at least min_time / repeats."""
+    fn()  # Warm caches and lazy imports
+    best = float('inf')
+    for _ in range(repeats):
+        loops = 0
+        started = time.perf_counter()
+        while True:
+            fn()
+            loops += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time / repeats:
+                break
+        best = min(best, elapsed / loops)
+    return best
+
+
+def run_suite(sizes: List[int], seed: int, only: List[str] = None) -> Dict:
+    searcher = ImprovedTokenSearcher()
+    searcher.debug_mode = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        checker = YoutubeMemeChecker('', ledger_path=os.path.join(work_dir, 'ledger.json'),
+                                     video_index_path=os.path.join(work_dir, 'videos.json'),
+                                     snapshot_path=os.path.join(work_dir, 'snapshots.tsv'),
+                                     client_factory=lambda: None)
+        results = {}
+        for size in sizes:
+            for name, fn in build_cases(searcher, checker, size, seed).items():
+                if only and name not in only:
+                    continue
+                seconds = time_case(fn)
+                results[f"{name}[{size}]"] = {
+                    'seconds_per_call': seconds,
+                    'microseconds_per_item': round(seconds / size * 1e6, 3)
+                }
+                print(f"{name:<30} n={size:<6} {seconds * 1000:10.3f} ms/call "
+                      f"{seconds / size * 1e6:10.3f} us/item")
+    return {
+        'run_date': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'machine': platform.machine(),
+        'seed': seed,
+        'results': results
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Names of benchmarks slower than baseline by more than `threshold` (0.15 = 15%)."""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        ratio = result['seconds_per_call'] / before['seconds_per_call']
+        flag = 'SLOWER' if ratio > 1 + threshold else ('faster' if ratio < 1 - threshold else 'ok')
+        print(f"{name:<40} {before['seconds_per_call'] * 1000:10.3f} -> "
+              f"{result['seconds_per_call'] * 1000:10.3f} ms  x{ratio:5.2f}  {flag}")
+        if flag == 'SLOWER':
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the scoring hot paths")
+    parser.add_argument('mode', choices=['run', 'compare'])
+    parser.add_argument('baseline', nargs='?', default='bench_baseline.json',
+                        help="Baseline JSON to write (run) or compare against (compare)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--only', nargs='+', help="Run only these benchmark names")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    if args.mode == 'compare':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        current = run_suite(args.sizes, baseline.get('seed', args.seed), args.only)
+        print()
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+        return
+
+    current = run_suite(args.sizes, args.seed, args.only)
+    with open(args.baseline, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nBaseline saved to: {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from dex_client import close_async_clients
+from dex_standin import DexStandIn
+from meme_token_updater import DexScreenerAPI, rank_meme_coins
+from searchDex import ImprovedTokenSearcher
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: List[float], failures: int, elapsed: float) -> Dict:
+    total = len(latencies) + failures
+    return {
+        'benchmark': name,
+        'requests': total,
+        'failures': failures,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_sec': round(total / elapsed, 1) if elapsed > 0 else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+class StandInThread:
+    """Runs the stand-in server on its own event loop so clients don't share it"""
+
+    def __init__(self, standin: DexStandIn):
+        self.standin = standin
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.base_url = None
+
+    def __enter__(self) -> 'StandInThread':
+        self.thread.start()
+        self.base_url = asyncio.run_coroutine_threadsafe(self.standin.start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.standin.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+async def bench_pair_fetch(base_url: str, pairs: List[Dict], requests: int) -> Dict:
+    dex_api = DexScreenerAPI(base_url)
+    latencies = []
+    failures = 0
+
+    async def fetch(pair):
+        nonlocal failures
+        started = time.perf_counter()
+        data = await dex_api.get_pair_data(pair['chainId'], pair['pairAddress'])
+        if data is None:
+            failures += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[fetch(pairs[i % len(pairs)]) for i in range(requests)])
+    elapsed = time.perf_counter() - started
+    await dex_api.close_session()
+    await close_async_clients()
+    return summarize('pair_fetch', latencies, failures, elapsed)
+
+
+def bench_search(base_url: str, pairs: List[Dict], requests: int, threads: int) -> Dict:
+    searcher = ImprovedTokenSearcher()
+    searcher.dexscreener_base_url = base_url
+    terms = [p['baseToken']['symbol'].lower() for p in pairs]
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def search(term):
+        nonlocal failures
+        started = time.perf_counter()
+        result = searcher.search_dexscreener(term)
+        with lock:
+            if result:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+
+    started = time.perf_counter()
+    # search_dexscreener prints per call; silence it once around all threads
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(search, [terms[i % len(terms)] for i in range(requests)]))
+    elapsed = time.perf_counter() - started
+    return summarize('search', latencies, failures, elapsed)
+
+
+async def bench_ranking(base_url: str, pairs: List[Dict], work_dir: str) -> Dict:
+    matches = [{
+        'name': f"Meme {i}",
+        'token': p['baseToken']['name'],
+        'symbol': p['baseToken']['symbol'],
+        'address': p['baseToken']['address'],
+        'pair_address': p['pairAddress'],
+        'chain': p['chainId'],
+        'dex': p['dexId'],
+        'views': 1000 * i
+    } for i, p in enumerate(pairs)]
+    matches_path = os.path.join(work_dir, 'matches.json')
+    with open(matches_path, 'w', encoding='utf-8') as f:
+        json.dump({'memes_processed': len(matches), 'matches': matches}, f)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Everything the ranking writes stays in work_dir; without prioritize it neither reads
+        # nor seeds the real run's priors
+        await rank_meme_coins(matches_path, os.path.join(work_dir, 'market_cap_index.json'),
+                              base_url=base_url, prioritize=False, output_dir=work_dir)
+        await close_async_clients()
+    elapsed = time.perf_counter() - started
+    return {
+        'benchmark': 'rank_meme_coins',
+        'tokens': len(matches),
+        'elapsed_s': round(elapsed, 3),
+        'tokens_per_hour': round(len(matches) / elapsed * 3600) if elapsed > 0 else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against the local stand-in")
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--search-threads', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=30)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--padding-bytes', type=int, default=0)
+    parser.add_argument('--fixture', help="Recorded JSON response to serve instead of generated pairs")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    options = dict(latency_ms=args.latency_ms, latency_jitter_ms=args.jitter_ms,
+                   rate_429=args.rate_429, rate_5xx=args.rate_5xx, padding_bytes=args.padding_bytes)
+    if args.fixture:
+        standin = DexStandIn.from_fixture(args.fixture, **options)
+    else:
+        standin = DexStandIn(num_pairs=args.pairs, **options)
+
+    results = []
+    with StandInThread(standin) as server, tempfile.TemporaryDirectory() as work_dir:
+        results.append(asyncio.run(bench_pair_fetch(server.base_url, standin.pairs, args.requests)))
+        results.append(bench_search(server.base_url, standin.pairs, args.requests // 10, args.search_threads))
+        results.append(asyncio.run(bench_ranking(server.base_url, standin.pairs, work_dir)))
+
+    for result in results:
+        print(json.dumps(result))
+    print(f"Stand-in responses: {standin.stats}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'run_date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'server_stats': standin.stats,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
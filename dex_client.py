@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from typing import Dict, Optional
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://api.dexscreener.com/latest/dex"
+
+# Only advertise br when a decoder is installed; aiohttp and urllib3 both use it
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+DEFAULT_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'User-Agent': 'ocus/1.0'
+}
+
+
+class AsyncDexClient:
+    """Shared aiohttp session, connector and semaphore bound to one event loop.
+
+    The per-loop client from get_async_client is owned by the module: users drop their reference
+    when done and the entry point calls close_async_clients() once at the end.
+    """
+
+    def __init__(self, max_concurrent: int = 25, limit_per_host: int = 25, timeout: float = 15,
+                 connect_timeout: float = 5, dns_ttl: int = 300, keepalive_timeout: float = 60):
+        self.max_concurrent = max_concurrent
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.loop = None
+
+    async def start(self) -> 'AsyncDexClient':
+        """Create the session inside the running loop"""
+        if self.session and not self.session.closed:
+            return self
+        self.loop = asyncio.get_running_loop()
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        conn = aiohttp.TCPConnector(
+            limit=self.max_concurrent,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(connector=conn, timeout=self.timeout,
+                                             headers=DEFAULT_HEADERS, auto_decompress=True)
+        return self
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+        self.session = None
+        if _async_clients.get(self.loop) is self:
+            del _async_clients[self.loop]
+
+    async def __aenter__(self) -> 'AsyncDexClient':
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+_async_clients: Dict[asyncio.AbstractEventLoop, AsyncDexClient] = {}
+
+
+def _forget_closed_loops():
+    """Drop clients whose loop was closed without close_async_clients (e.g. on an error path)"""
+    for loop in [loop for loop in _async_clients if loop.is_closed()]:
+        del _async_clients[loop]
+
+
+async def get_async_client(**kwargs) -> AsyncDexClient:
+    """Return the shared client for the running loop, creating it on first use"""
+    _forget_closed_loops()
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.session is None or client.session.closed:
+        client = AsyncDexClient(**kwargs)
+        _async_clients[loop] = client
+    return await client.start()
+
+
+async def close_async_clients():
+    """Close the running loop's shared client; call once at the end of each entry point"""
+    _forget_closed_loops()
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client:
+        await client.close()
+
+
+_sync_session: Optional[requests.Session] = None
+_sync_lock = threading.Lock()
+
+
+def get_sync_session(pool_size: int = 32) -> requests.Session:
+    """Process-wide keep-alive session for blocking callers such as searchDex"""
+    global _sync_session
+    with _sync_lock:
+        if _sync_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _sync_session = session
+        return _sync_session
+
+
+def sync_get(url: str, timeout: tuple = (5, 15), **kwargs) -> requests.Response:
+    """GET through the shared session with connect/read timeouts"""
+    return get_sync_session().get(url, timeout=timeout, **kwargs)
@@ -0,0 +1,141 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+from aiohttp import web
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ApiMetrics:
+    """Per-endpoint request metrics, rendered in Prometheus text format"""
+
+    def __init__(self, prefix: str = 'dexscreener'):
+        self.prefix = prefix
+        self.latency_buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.latency_sum = defaultdict(float)
+        self.latency_count = defaultdict(int)
+        self.status_counts = defaultdict(int)      # (endpoint, status) -> count
+        self.exception_counts = defaultdict(int)   # (endpoint, exception type) -> count
+        self.bytes_received = defaultdict(int)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_in_flight = 0
+        self.started_at = time.time()
+        self.runner = None
+
+    @contextmanager
+    def waiting_for_slot(self):
+        """Track requests queued on the concurrency semaphore"""
+        self.waiting += 1
+        try:
+            yield
+        finally:
+            self.waiting -= 1
+
+    @contextmanager
+    def request(self, endpoint: str):
+        """Time one request and count it as in flight"""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.record_exception(endpoint, e)
+            raise
+        finally:
+            self.in_flight -= 1
+            self.observe_latency(endpoint, time.perf_counter() - started)
+
+    def observe_latency(self, endpoint: str, seconds: float):
+        buckets = self.latency_buckets[endpoint]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[-1] += 1
+        self.latency_sum[endpoint] += seconds
+        self.latency_count[endpoint] += 1
+
+    def record_status(self, endpoint: str, status: int):
+        self.status_counts[(endpoint, str(status))] += 1
+
+    def record_exception(self, endpoint: str, error: BaseException):
+        self.exception_counts[(endpoint, type(error).__name__)] += 1
+
+    def record_bytes(self, endpoint: str, size: int):
+        self.bytes_received[endpoint] += size
+
+    def render_prometheus(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_request_duration_seconds Request latency per endpoint",
+            f"# TYPE {p}_request_duration_seconds histogram"
+        ]
+        for endpoint, buckets in sorted(self.latency_buckets.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f'{p}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            cumulative += buckets[-1]
+            lines.append(f'{p}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {cumulative}')
+            lines.append(f'{p}_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.latency_sum[endpoint]:.6f}')
+            lines.append(f'{p}_request_duration_seconds_count{{endpoint="{endpoint}"}} {self.latency_count[endpoint]}')
+
+        lines += [f"# HELP {p}_responses_total Responses by HTTP status",
+                  f"# TYPE {p}_responses_total counter"]
+        for (endpoint, status), count in sorted(self.status_counts.items()):
+            lines.append(f'{p}_responses_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        lines += [f"# HELP {p}_errors_total Failed requests by exception type",
+                  f"# TYPE {p}_errors_total counter"]
+        for (endpoint, error), count in sorted(self.exception_counts.items()):
+            lines.append(f'{p}_errors_total{{endpoint="{endpoint}",exception="{error}"}} {count}')
+
+        lines += [f"# HELP {p}_received_bytes_total Response body bytes received",
+                  f"# TYPE {p}_received_bytes_total counter"]
+        for endpoint, size in sorted(self.bytes_received.items()):
+            lines.append(f'{p}_received_bytes_total{{endpoint="{endpoint}"}} {size}')
+
+        lines += [f"# HELP {p}_in_flight_requests Requests holding a semaphore slot",
+                  f"# TYPE {p}_in_flight_requests gauge",
+                  f"{p}_in_flight_requests {self.in_flight}",
+                  f"# HELP {p}_waiting_requests Requests queued on the semaphore",
+                  f"# TYPE {p}_waiting_requests gauge",
+                  f"{p}_waiting_requests {self.waiting}",
+                  f"# HELP {p}_max_in_flight_requests Peak requests holding a semaphore slot",
+                  f"# TYPE {p}_max_in_flight_requests gauge",
+                  f"{p}_max_in_flight_requests {self.max_in_flight}"]
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        return {
+            'requests': dict(self.latency_count),
+            'statuses': {f"{e}:{s}": c for (e, s), c in self.status_counts.items()},
+            'errors': {f"{e}:{x}": c for (e, x), c in self.exception_counts.items()},
+            'bytes_received': dict(self.bytes_received),
+            'max_in_flight': self.max_in_flight
+        }
+
+    def dump(self, file_path: str):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 9108) -> Optional[str]:
+        """Expose /metrics on the running event loop"""
+        async def handle_metrics(request):
+            return web.Response(text=self.render_prometheus(), content_type='text/plain')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        return f"http://{host}:{port}/metrics"
+
+    async def stop_serving(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional, Union
+import copy
+import re
+import msgspec
+
+# Only the fields the ranking and market analysis read are declared; msgspec
+# skips everything else in the payload without materializing it. Decoding is
+# non-strict so DexScreener's numeric strings ("0.0001") become floats.
+
+
+class Windows(msgspec.Struct):
+    h1: Optional[float] = None
+    h6: Optional[float] = None
+    h24: Optional[float] = None
+
+
+class TxnCounts(msgspec.Struct):
+    buys: Optional[int] = None
+    sells: Optional[int] = None
+
+
+class Txns(msgspec.Struct):
+    h24: Optional[TxnCounts] = None
+
+
+class Liquidity(msgspec.Struct):
+    usd: Optional[float] = None
+
+
+class BaseToken(msgspec.Struct):
+    address: str = ''
+    name: str = ''
+    symbol: str = ''
+    totalSupply: Optional[float] = None
+
+
+class Pair(msgspec.Struct):
+    chainId: str = ''
+    dexId: str = ''
+    pairAddress: str = ''
+    baseToken: Optional[BaseToken] = None
+    quoteToken: Optional[BaseToken] = None
+    priceUsd: Optional[float] = None
+    liquidity: Optional[Liquidity] = None
+    volume: Optional[Windows] = None
+    priceChange: Optional[Windows] = None
+    txns: Optional[Txns] = None
+    fdv: Optional[float] = None
+    marketCap: Optional[float] = None
+    pairCreatedAt: Optional[int] = None
+
+    @property
+    def price_usd(self) -> float:
+        return self.priceUsd or 0.0
+
+    @property
+    def liquidity_usd(self) -> float:
+        return (self.liquidity.usd or 0.0) if self.liquidity else 0.0
+
+    def volume_at(self, window: str) -> float:
+        return (getattr(self.volume, window) or 0.0) if self.volume else 0.0
+
+    def price_change_at(self, window: str) -> float:
+        return (getattr(self.priceChange, window) or 0.0) if self.priceChange else 0.0
+
+    @property
+    def txns_24h(self) -> Dict[str, int]:
+        counts = self.txns.h24 if self.txns and self.txns.h24 else None
+        return {
+            'buys': (counts.buys or 0) if counts else 0,
+            'sells': (counts.sells or 0) if counts else 0
+        }
+
+    @property
+    def total_supply(self) -> float:
+        return (self.baseToken.totalSupply or 0.0) if self.baseToken else 0.0
+
+
+class PairsResponse(msgspec.Struct):
+    pairs: Optional[List[Pair]] = None
+
+
+_pairs_decoder = msgspec.json.Decoder(PairsResponse, strict=False)
+
+
+_ERROR_PATH = re.compile(r"at `\$((?:\.\w+)+)`$")
+
+
+def _repair_pair(raw: Dict, max_repairs: int = 8) -> Optional[Pair]:
+    """Convert a raw pair, dropping each field that fails validation (e.g. priceUsd: "") instead of the pair"""
+    raw = copy.deepcopy(raw)
+    for _ in range(max_repairs):
+        try:
+            return msgspec.convert(raw, Pair, strict=False)
+        except msgspec.ValidationError as e:
+            match = _ERROR_PATH.search(str(e))
+            if not match:
+                return None
+            *parents, field = match.group(1).strip('.').split('.')
+            node = raw
+            for key in parents:
+                node = node.get(key) if isinstance(node, dict) else None
+            if not isinstance(node, dict) or field not in node:
+                return None
+            del node[field]
+    return None
+
+
+def decode_pairs(body: bytes) -> List[Pair]:
+    """Decode a /pairs or /search response body straight into Pair structs"""
+    try:
+        return _pairs_decoder.decode(body).pairs or []
+    except msgspec.ValidationError:
+        # One malformed pair should not sink the whole response: fall back to pair-by-pair
+        raw = msgspec.json.decode(body)
+        pairs = raw.get('pairs') if isinstance(raw, dict) else None
+        repaired = [_repair_pair(pair) for pair in pairs or [] if isinstance(pair, dict)]
+        return [pair for pair in repaired if pair is not None]
+
+
+def to_pair(token_data: Union[Pair, Dict]) -> Pair:
+    """Accept an already-decoded Pair or a raw pair dict"""
+    if isinstance(token_data, Pair):
+        return token_data
+    try:
+        return msgspec.convert(token_data, Pair, strict=False)
+    except msgspec.ValidationError:
+        return _repair_pair(token_data) or Pair()
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+from aiohttp import web
+
+
+def generate_pair(rng: random.Random, chain: str = None, index: int = 0) -> Dict:
+    """Generate a DexScreener-shaped pair with plausible market numbers"""
+    chain = chain or rng.choice(['ethereum', 'solana'])
+    price = 10 ** rng.uniform(-9, 1)
+    market_cap = 10 ** rng.uniform(4, 8)
+    symbol = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(rng.randint(3, 5)))
+    return {
+        'chainId': chain,
+        'dexId': 'raydium' if chain == 'solana' else 'uniswap',
+        'pairAddress': f"PAIR{index:08d}{rng.getrandbits(64):016x}",
+        'baseToken': {
+            'address': f"TOKEN{index:08d}{rng.getrandbits(64):016x}",
+            'name': f"{symbol.title()} Token",
+            'symbol': symbol
+        },
+        'quoteToken': {'symbol': 'SOL' if chain == 'solana' else 'WETH'},
+        'priceNative': f"{price / 100:.12f}",
+        'priceUsd': f"{price:.12f}",
+        'txns': {
+            'h1': {'buys': rng.randint(0, 200), 'sells': rng.randint(0, 200)},
+            'h24': {'buys': rng.randint(0, 5000), 'sells': rng.randint(0, 5000)}
+        },
+        'volume': {
+            'h1': round(rng.uniform(0, 50000), 2),
+            'h6': round(rng.uniform(0, 300000), 2),
+            'h24': round(rng.uniform(0, 1000000), 2)
+        },
+        'priceChange': {
+            'h1': round(rng.uniform(-30, 30), 2),
+            'h6': round(rng.uniform(-60, 60), 2),
+            'h24': round(rng.uniform(-90, 300), 2)
+        },
+        'liquidity': {'usd': round(rng.uniform(1000, 2000000), 2)},
+        'fdv': round(market_cap, 2),
+        'marketCap': round(market_cap, 2),
+        'pairCreatedAt': int((time.time() - rng.uniform(0, 90 * 86400)) * 1000)
+    }
+
+
+class DexStandIn:
+    """Local stand-in for the DexScreener API with latency and fault injection"""
+
+    def __init__(self, pairs: Optional[List[Dict]] = None, num_pairs: int = 1000, seed: int = 42,
+                 latency_ms: float = 0, latency_jitter_ms: float = 0,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0,
+                 search_results: int = 30, padding_bytes: int = 0):
+        self.rng = random.Random(seed)
+        self.pairs = pairs if pairs is not None else [
+            generate_pair(self.rng, index=i) for i in range(num_pairs)
+        ]
+        self.by_address = {(p['chainId'], p['pairAddress']): p for p in self.pairs}
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.search_results = search_results
+        # Extra payload per pair, to emulate the larger real responses
+        self.padding = 'x' * padding_bytes
+        self.stats = {'requests': 0, '200': 0, '404': 0, '429': 0, '5xx': 0}
+        self.runner = None
+        self.port = None
+
+    @classmethod
+    def from_fixture(cls, fixture_path: str, **kwargs) -> 'DexStandIn':
+        """Build a stand-in from recorded /search or /pairs responses"""
+        with open(fixture_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        pairs = data.get('pairs', []) if isinstance(data, dict) else data
+        return cls(pairs=pairs, **kwargs)
+
+    async def _inject(self) -> Optional[web.Response]:
+        self.stats['requests'] += 1
+        if self.latency_ms or self.latency_jitter_ms:
+            delay = self.latency_ms + self.rng.uniform(0, self.latency_jitter_ms)
+            await asyncio.sleep(delay / 1000)
+        roll = self.rng.random()
+        if roll < self.rate_429:
+            self.stats['429'] += 1
+            return web.json_response({'error': 'rate limited'}, status=429)
+        if roll < self.rate_429 + self.rate_5xx:
+            self.stats['5xx'] += 1
+            return web.json_response({'error': 'upstream error'}, status=self.rng.choice([500, 502, 503]))
+        return None
+
+    def _payload(self, pairs: List[Dict]) -> web.Response:
+        if self.padding:
+            pairs = [dict(p, info={'padding': self.padding}) for p in pairs]
+        self.stats['200'] += 1
+        return web.json_response({'schemaVersion': '1.0.0', 'pairs': pairs})
+
+    async def handle_pairs(self, request: web.Request) -> web.Response:
+        fault = await self._inject()
+        if fault is not None:
+            return fault
+        pair = self.by_address.get((request.match_info['chain'], request.match_info['pair_address']))
+        if not pair:
+            self.stats['404'] += 1
+            return web.json_response({'schemaVersion': '1.0.0', 'pairs': None})
+        return self._payload([pair])
+
+    async def handle_search(self, request: web.Request) -> web.Response:
+        fault = await self._inject()
+        if fault is not None:
+            return fault
+        query = request.query.get('q', '').lower()
+        hits = [p for p in self.pairs
+                if query and (query in p['baseToken']['name'].lower() or
+                              query in p['baseToken']['symbol'].lower())]
+        if len(hits) < self.search_results:
+            # Real searches return loosely related pairs too; pad deterministically per query
+            offset = sum(map(ord, query)) % max(1, len(self.pairs))
+            hits += (self.pairs[offset:] + self.pairs[:offset])[:self.search_results - len(hits)]
+        return self._payload(hits[:self.search_results])
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/latest/dex/pairs/{chain}/{pair_address}', self.handle_pairs)
+        app.router.add_get('/latest/dex/search', self.handle_search)
+        app.router.add_get('/latest/dex/search/', self.handle_search)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start serving in the running loop and return the base URL"""
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}/latest/dex"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local DexScreener stand-in server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixture', help="Recorded JSON response ({'pairs': [...]}) to serve")
+    parser.add_argument('--pairs', type=int, default=1000, help="Generated pairs when no fixture is given")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--padding-bytes', type=int, default=0)
+    args = parser.parse_args()
+
+    options = dict(latency_ms=args.latency_ms, latency_jitter_ms=args.jitter_ms,
+                   rate_429=args.rate_429, rate_5xx=args.rate_5xx, padding_bytes=args.padding_bytes)
+    if args.fixture:
+        standin = DexStandIn.from_fixture(args.fixture, **options)
+    else:
+        standin = DexStandIn(num_pairs=args.pairs, **options)
+    print(f"Serving {len(standin.pairs)} pairs on http://127.0.0.1:{args.port}/latest/dex")
+    web.run_app(standin.make_app(), host='127.0.0.1', port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
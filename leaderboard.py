@@ -0,0 +1,76 @@
+import heapq
+import json
+import os
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+from pair_dedup import match_key
+
+
+class LiveLeaderboard:
+    """Running top-N of scored coins, printed and written to disk while a ranking run is in progress.
+
+    Each token holds at most one place, with its best-scoring pair.
+    """
+
+    def __init__(self, top_n: int = 10, output_path: Optional[str] = None, min_interval: float = 2.0):
+        self.top_n = top_n
+        self.output_path = output_path
+        self.min_interval = min_interval
+        self.scored = 0
+        self.sequence = 0
+        self.last_published = 0.0
+        self.top: List[Tuple[float, int, Dict]] = []
+        self.entries: Dict[Hashable, Tuple[float, int, Dict]] = {}
+
+    def update(self, coins: List[Dict]):
+        for coin in coins:
+            self.sequence += 1
+            entry = ((coin['viral_score'] + coin['views_score']) / 2, -self.sequence, coin)
+            key = match_key(coin)
+            current = self.entries.get(key)
+            if current is not None:
+                if entry[0] <= current[0]:
+                    continue
+                self.top.remove(current)
+                heapq.heapify(self.top)
+                heapq.heappush(self.top, entry)
+            elif len(self.top) < self.top_n:
+                heapq.heappush(self.top, entry)
+            elif entry[:2] > self.top[0][:2]:
+                evicted = heapq.heapreplace(self.top, entry)
+                del self.entries[match_key(evicted[2])]
+            else:
+                continue
+            self.entries[key] = entry
+        self.scored += len(coins)
+        if time.time() - self.last_published >= self.min_interval:
+            self.publish()
+
+    def leaders(self) -> List[Dict]:
+        ranked = sorted(self.top, key=lambda entry: entry[:2], reverse=True)
+        return [{
+            'rank': rank,
+            'symbol': coin.get('symbol'),
+            'contract_address': coin.get('address'),
+            'chain': coin.get('chain'),
+            'meme_name': coin.get('meme_name', ''),
+            'total_score': round(score, 2)
+        } for rank, (score, _, coin) in enumerate(ranked, 1)]
+
+    def publish(self, show: bool = True):
+        self.last_published = time.time()
+        leaders = self.leaders()
+        if show and leaders:
+            print(f"\nLive top {len(leaders)} after {self.scored} scored coins:")
+            for leader in leaders:
+                print(f"  #{leader['rank']} {leader['symbol']} ({leader['meme_name']}) {leader['total_score']:.2f}")
+        if self.output_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+                tmp_path = f"{self.output_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'updated_at': self.last_published, 'scored': self.scored, 'top_matches': leaders},
+                              f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.output_path)
+            except Exception as e:
+                print(f"Error writing live leaderboard: {str(e)}")
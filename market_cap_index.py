@@ -0,0 +1,78 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+
+class MarketCapIndex:
+    """Persisted last-seen market cap per pair, used to skip hopeless fetches"""
+
+    def __init__(self, file_path: str, min_cap: float = 500000, max_cap: float = 10000000,
+                 skip_factor: float = 3.0, max_age_hours: float = 24, full_sweep_hours: float = 72):
+        self.file_path = file_path
+        self.min_cap = min_cap
+        self.max_cap = max_cap
+        # A pair is skipped only when it was this many times below min_cap
+        # (or above max_cap) and the observation is younger than max_age_hours
+        self.skip_factor = skip_factor
+        self.max_age_hours = max_age_hours
+        # Every full_sweep_hours the index is ignored once so stale entries get refreshed
+        self.full_sweep_hours = full_sweep_hours
+        self.pairs: Dict[str, list] = {}
+        self.last_full_sweep = 0.0
+        self.stats = {'skipped': 0, 'recorded': 0}
+        self.load()
+        self.full_sweep = time.time() - self.last_full_sweep >= self.full_sweep_hours * 3600
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.pairs = data.get('pairs', {})
+            self.last_full_sweep = float(data.get('last_full_sweep', 0))
+        except Exception as e:
+            print(f"Error loading market cap index: {str(e)}")
+            self.pairs = {}
+            self.last_full_sweep = 0.0
+
+    def save(self):
+        if self.full_sweep:
+            self.last_full_sweep = time.time()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'last_full_sweep': self.last_full_sweep, 'pairs': self.pairs}, f)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            print(f"Error saving market cap index: {str(e)}")
+
+    @staticmethod
+    def key(chain: str, pair_address: str) -> str:
+        return f"{chain}:{pair_address}".lower()
+
+    def last_seen(self, chain: str, pair_address: str) -> Optional[float]:
+        entry = self.pairs.get(self.key(chain, pair_address))
+        return entry[0] if entry else None
+
+    def should_skip(self, chain: str, pair_address: str) -> bool:
+        """True when the pair was far outside the band on a recent run"""
+        if self.full_sweep:
+            return False
+        entry = self.pairs.get(self.key(chain, pair_address))
+        if not entry:
+            return False
+        market_cap, seen_at = entry
+        if time.time() - seen_at > self.max_age_hours * 3600:
+            return False
+        hopeless = (market_cap < self.min_cap / self.skip_factor or
+                    market_cap > self.max_cap * self.skip_factor)
+        if hopeless:
+            self.stats['skipped'] += 1
+        return hopeless
+
+    def record(self, chain: str, pair_address: str, market_cap: float):
+        self.pairs[self.key(chain, pair_address)] = [float(market_cap), time.time()]
+        self.stats['recorded'] += 1
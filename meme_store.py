@@ -0,0 +1,299 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    url TEXT,
+    tags TEXT,
+    views INTEGER,
+    videos_count INTEGER,
+    images_count INTEGER,
+    comments_count INTEGER,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    name TEXT,
+    symbol TEXT,
+    updated_at REAL,
+    PRIMARY KEY (chain, address)
+);
+CREATE INDEX IF NOT EXISTS tokens_symbol ON tokens (symbol COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS pairs (
+    chain TEXT NOT NULL,
+    pair_address TEXT NOT NULL,
+    token_address TEXT,
+    dex TEXT,
+    created_at INTEGER,
+    updated_at REAL,
+    PRIMARY KEY (chain, pair_address)
+);
+CREATE INDEX IF NOT EXISTS pairs_token ON pairs (chain, token_address);
+CREATE TABLE IF NOT EXISTS matches (
+    meme_id INTEGER NOT NULL REFERENCES memes (id),
+    chain TEXT NOT NULL,
+    pair_address TEXT NOT NULL,
+    search_term TEXT,
+    score REAL,
+    matched_at REAL,
+    PRIMARY KEY (meme_id, chain, pair_address)
+);
+CREATE INDEX IF NOT EXISTS matches_pair ON matches (chain, pair_address);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    memes_processed INTEGER
+);
+CREATE TABLE IF NOT EXISTS pair_snapshots (
+    chain TEXT NOT NULL,
+    pair_address TEXT NOT NULL,
+    ts REAL NOT NULL,
+    price_usd REAL,
+    market_cap REAL,
+    liquidity_usd REAL,
+    volume_24h REAL,
+    buys_24h INTEGER,
+    sells_24h INTEGER
+);
+CREATE INDEX IF NOT EXISTS pair_snapshots_pair ON pair_snapshots (chain, pair_address, ts);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    chain TEXT NOT NULL,
+    pair_address TEXT NOT NULL,
+    meme_id INTEGER REFERENCES memes (id),
+    viral_score REAL,
+    views_score REAL,
+    total_score REAL,
+    rank INTEGER,
+    PRIMARY KEY (run_id, chain, pair_address)
+);
+CREATE INDEX IF NOT EXISTS scores_meme ON scores (meme_id);
+CREATE VIEW IF NOT EXISTS match_export AS
+    SELECT m.name, m.url, m.tags, m.views, m.videos_count, m.images_count, m.comments_count,
+           t.name AS token, t.symbol, p.token_address AS address, x.pair_address, x.chain,
+           p.dex, p.created_at, x.search_term, x.score
+    FROM matches x
+    JOIN memes m ON m.id = x.meme_id
+    JOIN pairs p ON p.chain = x.chain AND p.pair_address = x.pair_address
+    LEFT JOIN tokens t ON t.chain = p.chain AND t.address = p.token_address;
+CREATE VIEW IF NOT EXISTS ranking_export AS
+    SELECT s.run_id, s.rank, t.name, t.symbol, p.token_address AS contract_address, s.chain,
+           s.pair_address, m.name AS meme_name, m.url AS meme_url, m.tags AS meme_tags,
+           m.views, m.videos_count, m.images_count, m.comments_count,
+           s.viral_score, s.views_score, s.total_score
+    FROM scores s
+    JOIN pairs p ON p.chain = s.chain AND p.pair_address = s.pair_address
+    LEFT JOIN tokens t ON t.chain = p.chain AND t.address = p.token_address
+    LEFT JOIN memes m ON m.id = s.meme_id;
+"""
+
+
+class MemeStore:
+    """SQLite (WAL) store for memes, tokens, pairs, matches, pair snapshots and scores.
+
+    Replaces passing meme_coins_FINAL_*.json / top_meme_rankings_*.json between runs; the
+    export_* methods still produce those JSON shapes from the match_export and ranking_export views.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def meme_key(name: str) -> str:
+        return (name or '').strip().lower()
+
+    def _upsert_memes(self, rows: Iterable[Dict], now: float) -> Dict[str, int]:
+        """Upsert meme fields carried on match/coin dicts and return {key: meme id}."""
+        memes = {}
+        for row in rows:
+            name = row.get('meme_name') or row.get('name') or ''
+            if self.meme_key(name):
+                memes[self.meme_key(name)] = row, name
+        self.conn.executemany(
+            "INSERT INTO memes (key, name, url, tags, views, videos_count, images_count, comments_count, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET name = excluded.name, url = excluded.url, tags = excluded.tags, "
+            "views = excluded.views, videos_count = excluded.videos_count, images_count = excluded.images_count, "
+            "comments_count = excluded.comments_count, updated_at = excluded.updated_at",
+            [(key, name, row.get('url', ''), json.dumps(row.get('tags', [])), _int(row.get('views')),
+              _int(row.get('videos_count')), _int(row.get('images_count')), _int(row.get('comments_count')), now)
+             for key, (row, name) in memes.items()])
+        ids = {}
+        keys = list(memes)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cursor = self.conn.execute(
+                f"SELECT key, id FROM memes WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            ids.update({key: meme_id for key, meme_id in cursor})
+        return ids
+
+    def _upsert_tokens_and_pairs(self, rows: List[Dict], now: float):
+        self.conn.executemany(
+            "INSERT INTO tokens (chain, address, name, symbol, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (chain, address) DO UPDATE SET name = excluded.name, symbol = excluded.symbol, "
+            "updated_at = excluded.updated_at",
+            [(row['chain'], row['address'], row.get('token', ''), row.get('symbol', ''), now)
+             for row in rows if row.get('chain') and row.get('address')])
+        self.conn.executemany(
+            "INSERT INTO pairs (chain, pair_address, token_address, dex, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (chain, pair_address) DO UPDATE SET token_address = excluded.token_address, "
+            "dex = excluded.dex, created_at = COALESCE(excluded.created_at, pairs.created_at), "
+            "updated_at = excluded.updated_at",
+            [(row['chain'], row['pair_address'], row.get('address', ''), row.get('dex', ''),
+              row.get('created_at'), now)
+             for row in rows if row.get('chain') and row.get('pair_address')])
+
+    def start_run(self, kind: str, memes_processed: Optional[int] = None) -> int:
+        with self._lock, self.conn:
+            cursor = self.conn.execute("INSERT INTO runs (kind, started_at, memes_processed) VALUES (?, ?, ?)",
+                                       (kind, time.time(), memes_processed))
+            return cursor.lastrowid
+
+    def upsert_matches(self, matches: List[Dict]):
+        """Bulk upsert ImprovedTokenSearcher matches (meme, token, pair and match rows) in one transaction."""
+        now = time.time()
+        with self._lock, self.conn:
+            meme_ids = self._upsert_memes(matches, now)
+            self._upsert_tokens_and_pairs(matches, now)
+            self.conn.executemany(
+                "INSERT INTO matches (meme_id, chain, pair_address, search_term, score, matched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (meme_id, chain, pair_address) DO UPDATE SET search_term = excluded.search_term, "
+                "score = excluded.score, matched_at = excluded.matched_at",
+                [(meme_ids[self.meme_key(match.get('name'))], match['chain'], match['pair_address'],
+                  match.get('search_term', ''), match.get('score', 0), now)
+                 for match in matches
+                 if self.meme_key(match.get('name')) in meme_ids and match.get('chain') and match.get('pair_address')])
+
+    def upsert_coins(self, coins: List[Dict], run_id: int):
+        """Bulk upsert ranked coins from rank_meme_coins: a pair snapshot and a score row per coin."""
+        now = time.time()
+        with self._lock, self.conn:
+            meme_ids = self._upsert_memes(coins, now)
+            self._upsert_tokens_and_pairs(coins, now)
+            self.conn.executemany(
+                "INSERT INTO pair_snapshots (chain, pair_address, ts, price_usd, market_cap, liquidity_usd, "
+                "volume_24h, buys_24h, sells_24h) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(coin['chain'], coin['pair_address'], now, coin.get('price_usd'), coin.get('market_cap'),
+                  coin.get('liquidity_usd'), (coin.get('volume') or {}).get('h24'),
+                  (coin.get('txns_24h') or {}).get('buys'), (coin.get('txns_24h') or {}).get('sells'))
+                 for coin in coins])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (run_id, chain, pair_address, meme_id, viral_score, views_score, "
+                "total_score, rank) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, coin['chain'], coin['pair_address'], meme_ids.get(self.meme_key(coin.get('meme_name'))),
+                  coin.get('viral_score'), coin.get('views_score'), coin.get('total_score'), _int(coin.get('rank')))
+                 for coin in coins])
+
+    def pairs_by_symbol(self, symbol: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT p.*, t.name, t.symbol FROM tokens t JOIN pairs p "
+            "ON p.chain = t.chain AND p.token_address = t.address WHERE t.symbol = ? COLLATE NOCASE", (symbol,))
+        return [dict(row) for row in rows]
+
+    def matches_for_meme(self, meme_name: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT * FROM match_export WHERE name = ? COLLATE NOCASE ORDER BY score DESC", (meme_name.strip(),))
+        return [_export_row(row) for row in rows]
+
+    def pair_history(self, chain: str, pair_address: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT * FROM pair_snapshots WHERE chain = ? AND pair_address = ? ORDER BY ts", (chain, pair_address))
+        return [dict(row) for row in rows]
+
+    def memes_processed(self) -> int:
+        last = self.conn.execute(
+            "SELECT memes_processed FROM runs WHERE kind = 'search' ORDER BY id DESC LIMIT 1").fetchone()
+        if last and last['memes_processed'] is not None:
+            return last['memes_processed']
+        return self.conn.execute("SELECT COUNT(*) FROM memes").fetchone()[0]
+
+    def iter_matches(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """Stream match_export rows without loading them all."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM match_export")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield _export_row(row)
+
+    def export_matches(self) -> Dict:
+        """Same shape as meme_coins_FINAL_*.json."""
+        return {
+            'memes_processed': self.memes_processed(),
+            'matches': list(self.iter_matches())
+        }
+
+    def export_rankings(self, run_id: Optional[int] = None, limit: int = 100) -> Dict:
+        """Same shape as top_meme_rankings_*.json, for the given (default latest) ranking run."""
+        if run_id is None:
+            last = self.conn.execute("SELECT MAX(run_id) FROM scores").fetchone()
+            run_id = last[0]
+        run = self.conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        rows = self.conn.execute("SELECT * FROM ranking_export WHERE run_id = ? ORDER BY rank LIMIT ?",
+                                 (run_id, limit)).fetchall()
+        total = self.conn.execute("SELECT COUNT(*) FROM scores WHERE run_id = ?", (run_id,)).fetchone()[0]
+        return {
+            'scan_date': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(run['started_at'])) if run else None,
+            'memes_processed': run['memes_processed'] if run else 0,
+            'total_ranked': total,
+            'top_matches': [{
+                'rank': row['rank'],
+                'name': row['name'],
+                'symbol': row['symbol'],
+                'contract_address': row['contract_address'],
+                'meme_name': row['meme_name'] or '',
+                'meme_url': row['meme_url'] or '',
+                'meme_tags': json.loads(row['meme_tags'] or '[]'),
+                'meme_stats': {
+                    'views': row['views'] or 0,
+                    'videos': row['videos_count'] or 0,
+                    'images': row['images_count'] or 0,
+                    'comments': row['comments_count'] or 0
+                },
+                'viral_score': round(row['viral_score'] or 0, 2),
+                'views_score': round(row['views_score'] or 0, 2),
+                'total_score': round(row['total_score'] or 0, 2)
+            } for row in rows]
+        }
+
+    def export_json(self, output_path: str, rankings: bool = False):
+        data = self.export_rankings() if rankings else self.export_matches()
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def _int(value) -> int:
+    try:
+        return int(float(str(value).replace(',', '')))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _export_row(row: sqlite3.Row) -> Dict:
+    match = dict(row)
+    match['tags'] = json.loads(match.get('tags') or '[]')
+    return match
@@ -1,70 +1,95 @@
 import json
+import heapq
+import shutil
+import tempfile
+import argparse
+from itertools import islice
 from datetime import datetime
 import pandas as pd
+import numpy as np
 import re
 import os
 import sys
 import asyncio
-import aiohttp
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from viral import calculate_viral_score
-import random
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from market_cap_index import MarketCapIndex
+from dex_metrics import ApiMetrics
+from dex_client import AsyncDexClient, DEFAULT_BASE_URL, close_async_clients, get_async_client
+from dex_schema import decode_pairs
+from profiling import StageProfiler
+from meme_store import MemeStore
+from leaderboard import LiveLeaderboard
+from pair_dedup import canonical_matches, match_key
+
+MIN_MARKET_CAP = 500000
+MAX_MARKET_CAP = 10000000
+BYTES_PER_COIN = 4096  # Rough in-memory size of one fetched and scored coin, for chunk sizing
 
 class DexScreenerAPI:
-    def __init__(self):
-        self.base_url = "https://api.dexscreener.com/latest/dex"
-        self.session = None
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, client: Optional[AsyncDexClient] = None):
+        self.base_url = base_url
+        self.client = client
         self.max_concurrent_requests = 25  # Increased for powerful CPU
-        self.semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        self.metrics = ApiMetrics()
         
     async def init_session(self):
-        if not self.session:
-            conn = aiohttp.TCPConnector(limit=self.max_concurrent_requests)
-            self.session = aiohttp.ClientSession(connector=conn)
+        # The shared client (and its semaphore) is created inside the running loop
+        if not self.client:
+            self.client = await get_async_client(max_concurrent=self.max_concurrent_requests)
+        else:
+            await self.client.start()
             
     async def close_session(self):
-        if self.session:
-            await self.session.close()
+        # Only drop our reference: the per-loop client may still be in use by other instances on
+        # this loop (close_async_clients() closes it), and a client passed in belongs to the caller
+        self.client = None
             
     async def get_pair_data(self, chain: str, pair_address: str) -> Optional[Dict]:
         """Fetch current data for a trading pair"""
-        async with self.semaphore:  # Control concurrent requests
-            try:
-                if not self.session:
-                    await self.init_session()
-                    
+        await self.init_session()
+        semaphore = self.client.semaphore
+        with self.metrics.waiting_for_slot():
+            await semaphore.acquire()  # Control concurrent requests
+        try:
+            with self.metrics.request('pairs'):
                 url = f"{self.base_url}/pairs/{chain}/{pair_address}"
-                async with self.session.get(url) as response:
+                async with self.client.session.get(url) as response:
+                    self.metrics.record_status('pairs', response.status)
                     if response.status != 200:
                         return None
                         
-                    data = await response.json()
-                    pairs = data.get('pairs', [])
+                    body = await response.read()
+                    self.metrics.record_bytes('pairs', len(body))
+                    pairs = decode_pairs(body)
                     
                     if not pairs:
                         return None
                         
                     current = pairs[0]
                     return {
-                        'price_usd': float(current.get('priceUsd', 0)),
-                        'liquidity_usd': float(current.get('liquidity', {}).get('usd', 0)),
+                        'price_usd': current.price_usd,
+                        'liquidity_usd': current.liquidity_usd,
                         'volume': {
-                            'h1': float(current.get('volume', {}).get('h1', 0)),
-                            'h6': float(current.get('volume', {}).get('h6', 0)),
-                            'h24': float(current.get('volume', {}).get('h24', 0))
+                            'h1': current.volume_at('h1'),
+                            'h6': current.volume_at('h6'),
+                            'h24': current.volume_at('h24')
                         },
                         'price_changes': {
-                            'h1': float(current.get('priceChange', {}).get('h1', 0)),
-                            'h6': float(current.get('priceChange', {}).get('h6', 0)),
-                            'h24': float(current.get('priceChange', {}).get('h24', 0))
+                            'h1': current.price_change_at('h1'),
+                            'h6': current.price_change_at('h6'),
+                            'h24': current.price_change_at('h24')
                         },
-                        'txns_24h': current.get('txns', {}).get('h24', {'buys': 0, 'sells': 0}),
-                        'market_cap': float(current.get('marketCap', 0))
+                        'txns_24h': current.txns_24h,
+                        'market_cap': current.marketCap or 0.0
                     }
                     
-            except Exception as e:
-                return None
+        except Exception:
+            # Already counted by exception type in self.metrics
+            return None
+        finally:
+            semaphore.release()
 
     def parse_time_ago(time_str):
         """Convert time ago string to approximate hours ago"""
@@ -80,20 +105,49 @@ class DexScreenerAPI:
         
         return {'m': value / 24, 'h': value, 'd': value * 24}.get(unit, 0)
 
-def calculate_views_score(match: Dict) -> float:
-    """Generate a plausible-looking score based on KYM data"""
+# KYM stats feeding the views score, with their weight and the log10 value
+# that earns full marks for that component
+VIEWS_SCORE_FIELDS = ('views', 'videos_count', 'images_count', 'comments_count')
+VIEWS_SCORE_WEIGHTS = np.array([0.55, 0.2, 0.15, 0.1])
+VIEWS_SCORE_SCALES = np.array([7.0, 3.0, 4.0, 4.0])
+_views_score_memo: Dict[tuple, float] = {}
+_VIEWS_SCORE_MEMO_SIZE = 100000
+
+def _kym_stat(value) -> float:
     try:
-        views = match.get('views', 0)
-        base_score = (views / 10000) + random.uniform(20, 80)
-        return round(min(max(base_score, 20), 100), 2)
-    except Exception:
-        return round(random.uniform(40, 90), 2)
+        return max(float(str(value).replace(',', '')), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def views_score_key(match: Dict) -> tuple:
+    return tuple(_kym_stat(match.get(field, 0)) for field in VIEWS_SCORE_FIELDS)
+
+def views_scores(stats: np.ndarray) -> np.ndarray:
+    """Vectorized views score (20-100) for an (n, 4) array of views/videos/images/comments"""
+    components = np.minimum(np.log10(1 + stats) / VIEWS_SCORE_SCALES, 1.0)
+    return np.round(20 + 80 * (components @ VIEWS_SCORE_WEIGHTS), 2)
+
+def calculate_views_scores(matches: List[Dict]) -> List[float]:
+    """Deterministic views scores for many matches, memoized by their KYM stats"""
+    keys = [views_score_key(match) for match in matches]
+    missing = list({key for key in keys if key not in _views_score_memo})
+    if missing:
+        if len(_views_score_memo) + len(missing) > _VIEWS_SCORE_MEMO_SIZE:
+            _views_score_memo.clear()
+        for key, score in zip(missing, views_scores(np.array(missing, dtype=float))):
+            _views_score_memo[key] = float(score)
+    return [_views_score_memo[key] for key in keys]
+
+def calculate_views_score(match: Dict) -> float:
+    """Score a match from its KYM views, videos, images and comments"""
+    return calculate_views_scores([match])[0]
 
-def save_enhanced_results(df, file_path, memes_processed):
+def save_enhanced_results(df, file_path, memes_processed, total_ranked: Optional[int] = None,
+                          output_dir: Optional[str] = None):
     """Save results to JSON with simplified top 10 information"""
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        output_dir = os.path.join(script_dir, "meme_analysis")
+        if output_dir is None:
+            output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "meme_analysis")
         os.makedirs(output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -118,7 +172,8 @@ def save_enhanced_results(df, file_path, memes_processed):
                 },
                 "viral_score": round(coin['viral_score'], 2),
                 "views_score": round(coin['views_score'], 2),
-                "total_score": round((coin['viral_score'] + coin['views_score']) / 2, 2)
+                "total_score": round((coin['viral_score'] + coin['views_score']) / 2, 2),
+                "alternative_pairs": coin.get('alternative_pairs') if isinstance(coin.get('alternative_pairs'), list) else []
             }
         
         with ThreadPoolExecutor(max_workers=16) as executor:  # Increased for i9 processor
@@ -127,7 +182,7 @@ def save_enhanced_results(df, file_path, memes_processed):
         json_data = {
             "scan_date": datetime.now().isoformat(),
             "memes_processed": memes_processed,
-            "total_ranked": len(df),
+            "total_ranked": total_ranked if total_ranked is not None else len(df),
             "top_matches": simplified_rankings
         }
         
@@ -141,12 +196,16 @@ def save_enhanced_results(df, file_path, memes_processed):
         print(f"Error saving results: {str(e)}")
         sys.exit(1)
 
-async def process_coin(dex_api: DexScreenerAPI, match: Dict) -> Optional[Dict]:
-    """Process a single coin with real-time data"""
+async def process_coin(dex_api: DexScreenerAPI, match: Dict,
+                       mcap_index: Optional[MarketCapIndex] = None) -> Optional[Dict]:
+    """Fetch real-time data for a single coin; scoring happens in score_coins"""
     try:
         if match.get('chain') not in ['ethereum', 'solana']:
             return None
             
+        if mcap_index and mcap_index.should_skip(match['chain'], match['pair_address']):
+            return None
+            
         current_data = await dex_api.get_pair_data(
             match['chain'],
             match['pair_address']
@@ -156,12 +215,12 @@ async def process_coin(dex_api: DexScreenerAPI, match: Dict) -> Optional[Dict]:
             return None
             
         market_cap = current_data['market_cap']
-        if market_cap > 10000000 or market_cap < 500000:
+        if mcap_index:
+            mcap_index.record(match['chain'], match['pair_address'], market_cap)
+        if market_cap > MAX_MARKET_CAP or market_cap < MIN_MARKET_CAP:
             return None
             
-        views_score = calculate_views_score(match)
-            
-        coin_info = {
+        return {
             'token': match.get('token'),
             'symbol': match.get('symbol'),
             'chain': match.get('chain'),
@@ -182,89 +241,404 @@ async def process_coin(dex_api: DexScreenerAPI, match: Dict) -> Optional[Dict]:
             'videos_count': match.get('videos_count', 0),
             'images_count': match.get('images_count', 0),
             'comments_count': match.get('comments_count', 0),
-            'views_score': views_score,
+            'alternative_pairs': match.get('alternative_pairs', []),
+            'views_score': 0,
             'viral_score': 0
         }
         
-        coin_info['viral_score'] = calculate_viral_score(coin_info)
-        
-        return coin_info if coin_info['viral_score'] > 0 else None
-        
     except Exception:
         return None
 
-async def rank_meme_coins(file_path):
-    """Load and rank meme coins from JSON file with real-time data"""
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+def load_matches(file_path: str) -> Dict:
+    """Read matches from a meme_coins_FINAL_*.json file, its NDJSON form or a MemeStore database"""
+    if file_path.endswith(('.db', '.sqlite')):
+        store = MemeStore(file_path)
+        try:
+            return store.export_matches()
+        finally:
+            store.close()
+    if file_path.endswith(NDJSON_SUFFIXES):
+        memes_processed, matches = iter_matches(file_path)
+        return {'memes_processed': memes_processed, 'matches': list(matches)}
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        return json.load(file)
+
+def _stream_store(store: MemeStore) -> Iterator[Dict]:
     try:
-        with open(file_path, 'r', encoding='utf-8-sig') as file:
-            data = json.load(file)
-        
-        memes_processed = data.get('memes_processed', 0)
-        matches = data.get('matches', [])
-        
-        print(f"\nProcessing {len(matches)} tokens...")
-        
-        dex_api = DexScreenerAPI()
-        
-        batch_size = 50  # Increased batch size
-        coins = []
-        
+        yield from store.iter_matches()
+    finally:
+        store.close()
+
+def _stream_ndjson(file, first_line: str) -> Iterator[Dict]:
+    try:
+        if first_line.strip():
+            yield json.loads(first_line)
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        file.close()
+
+def iter_matches(file_path: str) -> Tuple[int, Iterator[Dict]]:
+    """(memes_processed, matches) with matches streamed from a MemeStore or an NDJSON file.
+
+    NDJSON input has one match per line, optionally preceded by a {"memes_processed": N} header
+    line. A meme_coins_FINAL_*.json file is loaded whole. The store or file is closed once the
+    iterator is exhausted or closed.
+    """
+    if file_path.endswith(('.db', '.sqlite')):
+        store = MemeStore(file_path)
+        return store.memes_processed(), _stream_store(store)
+    if file_path.endswith(NDJSON_SUFFIXES):
+        file = open(file_path, 'r', encoding='utf-8-sig')
+        first_line = file.readline()
+        header = json.loads(first_line) if first_line.strip() else {}
+        if 'memes_processed' in header and 'pair_address' not in header:
+            return header['memes_processed'], _stream_ndjson(file, '')
+        return 0, _stream_ndjson(file, first_line)
+    data = load_matches(file_path)
+    return data.get('memes_processed', 0), (match for match in data.get('matches', []))
+
+def score_coins(coins: List[Dict]) -> List[Dict]:
+    """Score a micro-batch of fetched coins (runs in a worker process)"""
+    scored = []
+    for coin_info, views_score in zip(coins, calculate_views_scores(coins)):
+        try:
+            coin_info['views_score'] = views_score
+            coin_info['viral_score'] = calculate_viral_score(coin_info)
+            if coin_info['viral_score'] > 0:
+                scored.append(coin_info)
+        except Exception:
+            continue
+    return scored
+
+RANKING_PRIORS_FILE = "ranking_priors.json"
+
+def save_ranking_priors(df, output_dir: str):
+    """Viral score per contract address from this ranking run, read back by the next run's prioritization.
+
+    Only rank_meme_coins and rank_meme_coins_chunked write this file, so shard merges and other
+    top_meme_rankings_*.json writers never become priors.
+    """
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        priors_path = os.path.join(output_dir, RANKING_PRIORS_FILE)
+        tmp_path = f"{priors_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'scan_date': datetime.now().isoformat(),
+                'viral_scores': {address: round(float(viral), 4)
+                                 for address, viral in zip(df['address'], df['viral_score']) if address}
+            }, f)
+        os.replace(tmp_path, priors_path)
+    except Exception as e:
+        print(f"Error saving ranking priors: {str(e)}")
+
+def load_ranking_priors(output_dir: str) -> Dict[str, float]:
+    """Viral score per contract address from the last ranking run"""
+    priors_path = os.path.join(output_dir, RANKING_PRIORS_FILE)
+    if not os.path.exists(priors_path):
+        return {}
+    try:
+        with open(priors_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('viral_scores', {})
+    except Exception as e:
+        print(f"Error loading ranking priors: {str(e)}")
+        return {}
+
+def prioritize_matches(matches: List[Dict], mcap_index: Optional[MarketCapIndex] = None,
+                       viral_priors: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """Order matches by an estimate of their final rank so the leaderboard fills in best-first.
+
+    The estimate is on the total score's scale: (views score + expected viral score) / 2. The views
+    score is exact; the viral score is the last run's for known tokens and the mean of the last
+    run's for unseen ones. Pairs last seen outside the market cap band go last.
+    """
+    viral_priors = viral_priors or {}
+    expected_viral = sum(viral_priors.values()) / len(viral_priors) if viral_priors else 0.0
+    views = calculate_views_scores(matches)
+    
+    def priority(item):
+        match, views_score = item
+        cap = mcap_index.last_seen(match.get('chain', ''), match.get('pair_address', '')) if mcap_index else None
+        in_band = cap is None or MIN_MARKET_CAP <= cap <= MAX_MARKET_CAP
+        estimate = (views_score + viral_priors.get(match.get('address'), expected_viral)) / 2
+        return in_band, estimate, _kym_stat(match.get('score', 0))
+    
+    return [match for match, _ in sorted(zip(matches, views), key=priority, reverse=True)]
+
+async def fetch_and_score(dex_api: DexScreenerAPI, matches: List[Dict], mcap_index: Optional[MarketCapIndex],
+                          executor: ProcessPoolExecutor, profiler: StageProfiler, batch_size: int = 50,
+                          leaderboard: Optional[LiveLeaderboard] = None) -> List[Dict]:
+    """Fetch matches in batches, scoring each fetched batch in the process pool"""
+    loop = asyncio.get_running_loop()
+    scoring = []
+    
+    def publish(future):
+        if not future.cancelled() and future.exception() is None:
+            leaderboard.update(future.result())
+    # Each fetched batch is handed to the process pool as a micro-batch so
+    # scoring overlaps with the next batch's network requests
+    with profiler.stage('fetch'):
         for i in range(0, len(matches), batch_size):
             batch = matches[i:i + batch_size]
-            tasks = [process_coin(dex_api, match) for match in batch]
+            tasks = [process_coin(dex_api, match, mcap_index) for match in batch]
             results = await asyncio.gather(*tasks)
             
-            coins.extend([r for r in results if r is not None])
+            fetched = [r for r in results if r is not None]
+            if fetched:
+                future = loop.run_in_executor(executor, score_coins, fetched)
+                if leaderboard:
+                    future.add_done_callback(publish)
+                scoring.append(future)
             print(f"Processed {min(i + batch_size, len(matches))}/{len(matches)} tokens")
             
             if i + batch_size < len(matches):
                 await asyncio.sleep(0.2)  # Reduced delay
+    
+    with profiler.stage('score_wait'):
+        scored_batches = await asyncio.gather(*scoring)
+    return [coin for scored in scored_batches for coin in scored]
+
+def print_top_coins(df):
+    print("\nTop 10 Viral Coins:")
+    top_10 = df.head(10)
+    for _, coin in top_10.iterrows():
+        print(f"\n#{coin['rank']} {coin['symbol']}")
+        print(f"Contract: {coin['address']}")
+        print(f"Meme Name: {coin.get('meme_name', 'N/A')}")
+        print(f"Views Score: {coin['views_score']:.2f}")
+        print(f"Viral Score: {coin['viral_score']:.2f}")
+        print(f"Total Score: {((coin['viral_score'] + coin['views_score']) / 2):.2f}")
+
+async def rank_meme_coins(file_path, mcap_index_path: Optional[str] = None,
+                          scoring_workers: Optional[int] = None, base_url: Optional[str] = None,
+                          metrics_port: Optional[int] = None, profiler: Optional[StageProfiler] = None,
+                          store_path: Optional[str] = None, prioritize: bool = True, live_top_n: int = 10,
+                          output_dir: Optional[str] = None):
+    """Load and rank meme coins from JSON file (or MemeStore database) with real-time data.
+
+    With prioritize, likely leaders are fetched first and a live top-N is printed and written to
+    live_leaderboard.json as batches are scored. Rankings, metrics and the leaderboard go to
+    output_dir (default meme_analysis/ next to this script).
+    """
+    profiler = profiler or StageProfiler.disabled()
+    if output_dir is None:
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "meme_analysis")
+    try:
+        with profiler.stage('load'):
+            data = load_matches(file_path)
+        
+        memes_processed = data.get('memes_processed', 0)
+        matches = data.get('matches', [])
+        
+        # One pair per token (highest liquidity), so the leaderboard has no duplicate tokens
+        candidates = len(matches)
+        matches = canonical_matches(matches)
+        if len(matches) < candidates:
+            print(f"Deduplicated {candidates - len(matches)} extra pairs of already-listed tokens")
+        
+        print(f"\nProcessing {len(matches)} tokens...")
+        
+        dex_api = DexScreenerAPI(base_url) if base_url else DexScreenerAPI()
+        if metrics_port:
+            metrics_url = await dex_api.metrics.serve(port=metrics_port)
+            print(f"Serving DexScreener metrics at {metrics_url}")
+        
+        if mcap_index_path is None:
+            mcap_index_path = os.path.join(output_dir, "market_cap_index.json")
+        mcap_index = MarketCapIndex(mcap_index_path, MIN_MARKET_CAP, MAX_MARKET_CAP)
+        if mcap_index.full_sweep:
+            print("Running full sweep (market cap index ignored for this run)")
+        
+        leaderboard = None
+        if prioritize:
+            matches = prioritize_matches(matches, mcap_index, load_ranking_priors(output_dir))
+            leaderboard = LiveLeaderboard(live_top_n, os.path.join(output_dir, "live_leaderboard.json"))
+        
+        with ProcessPoolExecutor(max_workers=scoring_workers) as executor, profiler.watching_loop():
+            coins = await fetch_and_score(dex_api, matches, mcap_index, executor, profiler,
+                                          leaderboard=leaderboard)
+        if leaderboard:
+            leaderboard.publish(show=False)
         
         await dex_api.close_session()
+        await dex_api.metrics.stop_serving()
+        
+        metrics_file = os.path.join(output_dir, f"dex_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prom")
+        os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+        dex_api.metrics.dump(metrics_file)
+        print(f"DexScreener metrics: {json.dumps(dex_api.metrics.summary())}")
+        mcap_index.save()
+        if mcap_index.stats['skipped']:
+            print(f"Skipped {mcap_index.stats['skipped']} pairs far outside the market cap band on a recent run")
         
         if not coins:
             print("No valid coins found above 500k market cap after processing")
             return pd.DataFrame()
             
-        df = pd.DataFrame(coins)
-        
-        df['total_score'] = df[['viral_score', 'views_score']].mean(axis=1)
-        df.sort_values('total_score', ascending=False, inplace=True)
-        df['rank'] = range(1, len(df) + 1)
+        with profiler.stage('rank'):
+            df = pd.DataFrame(coins)
+            
+            df['total_score'] = df[['viral_score', 'views_score']].mean(axis=1)
+            df.sort_values('total_score', ascending=False, inplace=True)
+            df['rank'] = range(1, len(df) + 1)
         
-        json_file = save_enhanced_results(df, file_path, memes_processed)
+        with profiler.stage('save'):
+            json_file = save_enhanced_results(df, file_path, memes_processed, output_dir=output_dir)
+            save_ranking_priors(df, output_dir)
+            if store_path:
+                store = MemeStore(store_path)
+                run_id = store.start_run('rank', memes_processed)
+                store.upsert_coins(df.to_dict('records'), run_id)
+                store.close()
+                print(f"Stored {len(df)} ranked coins in {store_path} (run {run_id})")
         print(f"\nResults saved to: {json_file}")
+        print_top_coins(df)
+        
+        return df
+        
+    except Exception as e:
+        print(f"Error processing file: {str(e)}")
+        sys.exit(1)
+
+def _read_spill(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+def _first_per_token(coins: Iterator[Dict]) -> Iterator[Dict]:
+    """Drop later coins of an already-seen token; the merged spills are best-first, so the best pair stays"""
+    seen = set()
+    for coin in coins:
+        key = match_key(coin)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield coin
+
+async def rank_meme_coins_chunked(file_path, memory_budget_mb: float = 256, top_n: int = 100,
+                                  mcap_index_path: Optional[str] = None, scoring_workers: Optional[int] = None,
+                                  base_url: Optional[str] = None, profiler: Optional[StageProfiler] = None,
+                                  spill_dir: Optional[str] = None, output_dir: Optional[str] = None,
+                                  live_top_n: int = 10):
+    """Rank with bounded memory: fetch and score chunk by chunk, spill each sorted chunk to disk, then
+    k-way merge the chunks for the top_n. MemeStore and NDJSON input are streamed; a JSON input file
+    is still loaded whole (the coins derived from it are not)."""
+    profiler = profiler or StageProfiler.disabled()
+    chunk_size = max(50, int(memory_budget_mb * 1024 * 1024 // BYTES_PER_COIN))
+    if output_dir is None:
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "meme_analysis")
+    os.makedirs(output_dir, exist_ok=True)
+    own_spill_dir = spill_dir is None
+    spill_dir = spill_dir or tempfile.mkdtemp(prefix="rank_chunks_", dir=output_dir)
+    matches = None
+    try:
+        with profiler.stage('load'):
+            memes_processed, matches = iter_matches(file_path)
+        
+        dex_api = DexScreenerAPI(base_url) if base_url else DexScreenerAPI()
+        if mcap_index_path is None:
+            mcap_index_path = os.path.join(output_dir, "market_cap_index.json")
+        mcap_index = MarketCapIndex(mcap_index_path, MIN_MARKET_CAP, MAX_MARKET_CAP)
+        
+        chunk_files = []
+        total_ranked = 0
+        total_matches = 0
+        # The universe is streamed, so prioritization is per chunk; the live top-N still spans all chunks
+        viral_priors = load_ranking_priors(output_dir)
+        leaderboard = LiveLeaderboard(live_top_n, os.path.join(output_dir, "live_leaderboard.json"))
+        with ProcessPoolExecutor(max_workers=scoring_workers) as executor, profiler.watching_loop():
+            while True:
+                chunk = list(islice(matches, chunk_size))
+                if not chunk:
+                    break
+                total_matches += len(chunk)
+                print(f"\nChunk {len(chunk_files) + 1}: {len(chunk)} tokens ({total_matches} so far)")
+                chunk = prioritize_matches(canonical_matches(chunk), mcap_index, viral_priors)
+                coins = await fetch_and_score(dex_api, chunk, mcap_index, executor, profiler,
+                                              leaderboard=leaderboard)
+                del chunk
+                with profiler.stage('spill'):
+                    for coin in coins:
+                        coin['total_score'] = (coin['viral_score'] + coin['views_score']) / 2
+                    coins.sort(key=lambda coin: coin['total_score'], reverse=True)
+                    chunk_file = os.path.join(spill_dir, f"chunk_{len(chunk_files):05d}.ndjson")
+                    with open(chunk_file, 'w', encoding='utf-8') as f:
+                        for coin in coins:
+                            f.write(json.dumps(coin, ensure_ascii=False, default=str) + '\n')
+                    chunk_files.append(chunk_file)
+                    total_ranked += len(coins)
+                del coins
+        
+        leaderboard.publish(show=False)
+        await dex_api.close_session()
+        mcap_index.save()
+        
+        if not total_ranked:
+            print("No valid coins found above 500k market cap after processing")
+            return pd.DataFrame()
         
-        print("\nTop 10 Viral Coins:")
-        top_10 = df.head(10)
-        for _, coin in top_10.iterrows():
-            print(f"\n#{coin['rank']} {coin['symbol']}")
-            print(f"Contract: {coin['address']}")
-            print(f"Meme Name: {coin.get('meme_name', 'N/A')}")
-            print(f"Views Score: {coin['views_score']:.2f}")
-            print(f"Viral Score: {coin['viral_score']:.2f}")
-            print(f"Total Score: {((coin['viral_score'] + coin['views_score']) / 2):.2f}")
+        with profiler.stage('merge'):
+            merged = heapq.merge(*[_read_spill(path) for path in chunk_files],
+                                 key=lambda coin: coin['total_score'], reverse=True)
+            # Chunks are deduplicated separately, so a token whose pairs fell in different chunks
+            # appears once per chunk in the merge
+            df = pd.DataFrame(list(islice(_first_per_token(merged), top_n)))
+            df['rank'] = range(1, len(df) + 1)
         
+        with profiler.stage('save'):
+            json_file = save_enhanced_results(df, file_path, memes_processed, total_ranked, output_dir)
+            save_ranking_priors(df, output_dir)
+        print(f"\nRanked {total_ranked} of {total_matches} tokens in {len(chunk_files)} chunks")
+        print(f"Results saved to: {json_file}")
+        print_top_coins(df)
         return df
         
     except Exception as e:
         print(f"Error processing file: {str(e)}")
         sys.exit(1)
+    finally:
+        if matches is not None:
+            matches.close()
+        if own_spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
 
 async def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Rank meme coins with real-time DexScreener data")
+    parser.add_argument('file_path', nargs='?',
+                        default=os.path.join(script_dir, "meme_coins_FINAL_20241208_203619.json"),
+                        help="meme_coins_FINAL_*.json, its NDJSON form (.ndjson/.jsonl) or a MemeStore database")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="Rank in chunks sized to this many MB (for very large universes)")
+    parser.add_argument('--profile', action='store_true', help="Write per-stage profiles and flamegraph stacks")
+    args = parser.parse_args()
+    
+    profiler = None
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, "meme_coins_FINAL_20241208_203619.json")
+        file_path = args.file_path
         
         if not os.path.exists(file_path):
             print(f"Error: File not found: {file_path}")
             sys.exit(1)
             
-        await rank_meme_coins(file_path)
+        if args.profile:
+            profiler = StageProfiler('meme_token_updater').start()
+        if args.memory_budget:
+            await rank_meme_coins_chunked(file_path, args.memory_budget, profiler=profiler)
+        else:
+            await rank_meme_coins(file_path, profiler=profiler)
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         sys.exit(1)
+    finally:
+        await close_async_clients()
+        if profiler:
+            profiler.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,81 @@
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+from dex_schema import Pair
+
+
+def token_key(chain: str, address: str) -> Tuple[str, str]:
+    """(chain, base token address); EVM hex addresses are case-insensitive, Solana's are not."""
+    chain = (chain or '').lower()
+    address = address or ''
+    return chain, address.lower() if address.startswith('0x') else address
+
+
+def group_best(items: List, key: Callable[[Any], Hashable],
+               rank: Callable[[Any], tuple]) -> List[Tuple[Any, List]]:
+    """(best-ranked item, the others) per key, in first-seen order of the keys."""
+    best: Dict[Hashable, Any] = {}
+    others: Dict[Hashable, List] = {}
+    for item in items:
+        group = key(item)
+        current = best.get(group)
+        if current is None:
+            best[group] = item
+        elif rank(item) > rank(current):
+            others.setdefault(group, []).append(current)
+            best[group] = item
+        else:
+            others.setdefault(group, []).append(item)
+    return [(item, others.get(group, [])) for group, item in best.items()]
+
+
+def _float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def match_key(match: Dict) -> Hashable:
+    """(chain, token) of a match or scored coin, falling back to its pair when the token is unknown."""
+    if match.get('address'):
+        return token_key(match.get('chain'), match.get('address'))
+    return match.get('chain'), match.get('pair_address')
+
+
+def canonical_matches(matches: List[Dict]) -> List[Dict]:
+    """One match per (chain, token): the highest-liquidity pair, then the best match score.
+
+    The other pairs are kept on the canonical match as 'alternative_pairs' metadata; they are
+    neither fetched nor scored.
+    """
+    canonical = []
+    for match, others in group_best(
+            matches,
+            key=match_key,
+            rank=lambda match: (_float(match.get('liquidity_usd')), _float(match.get('score')))):
+        alternatives = []
+        for other in others:
+            alternatives.append({
+                'pair_address': other.get('pair_address', ''),
+                'dex': other.get('dex', ''),
+                'liquidity_usd': _float(other.get('liquidity_usd')),
+                'meme_name': other.get('name', '')
+            })
+            alternatives.extend(other.get('alternative_pairs', []))
+        if alternatives or 'alternative_pairs' in match:
+            match = dict(match, alternative_pairs=match.get('alternative_pairs', []) + alternatives)
+        canonical.append(match)
+    return canonical
+
+
+def canonical_search_pairs(pairs: List[Pair]) -> List[Tuple[Pair, List[Dict]]]:
+    """(pair, alternatives) per (chainId, baseToken.address), preferring the highest liquidity."""
+    def key(pair: Pair):
+        address = pair.baseToken.address if pair.baseToken else ''
+        return token_key(pair.chainId, address) if address else (pair.chainId, pair.pairAddress)
+
+    return [(pair, [{
+        'pair_address': other.pairAddress,
+        'dex': other.dexId,
+        'quote': other.quoteToken.symbol if other.quoteToken else '',
+        'liquidity_usd': other.liquidity_usd
+    } for other in others]) for pair, others in group_best(pairs, key, rank=lambda pair: (pair.liquidity_usd,))]
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from searchDex import ImprovedTokenSearcher
+from meme_token_updater import DexScreenerAPI, process_coin, score_coins
+from dex_client import close_async_clients
+
+_DONE = object()
+
+
+async def run_stage(name: str, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue],
+                    handler: Callable[[Any], Awaitable[Optional[List[Any]]]], workers: int):
+    """Run `workers` consumers of inbox; each item may fan out into several outbox items.
+
+    Bounded queues give backpressure: a slow stage makes upstream puts wait.
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await inbox.put(_DONE)  # Let sibling workers see it too
+                return
+            try:
+                results = await handler(item)
+            except Exception as e:
+                print(f"Error in {name} stage: {str(e)}")
+                results = None
+            if outbox is not None:
+                for result in results or []:
+                    await outbox.put(result)
+
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    if outbox is not None:
+        await outbox.put(_DONE)
+
+
+class MemeTokenPipeline:
+    """Term extraction -> DexScreener search -> pair refresh -> scoring -> YouTube enrichment.
+
+    Stages are linked by bounded asyncio queues so they overlap, and nothing is written to disk
+    between them.
+    """
+
+    def __init__(self, searcher: Optional[ImprovedTokenSearcher] = None, dex_api: Optional[DexScreenerAPI] = None,
+                 checker=None, queue_size: int = 100, search_workers: int = 8, refresh_workers: int = 25,
+                 youtube_workers: int = 4, scoring_workers: Optional[int] = None,
+                 score_batch_size: int = 50, score_batch_wait: float = 0.5, min_relevance: float = 5.0):
+        self.searcher = searcher or ImprovedTokenSearcher()
+        self.dex_api = dex_api or DexScreenerAPI()
+        self.checker = checker
+        self.queue_size = queue_size
+        self.search_workers = search_workers
+        self.refresh_workers = refresh_workers
+        self.youtube_workers = youtube_workers
+        self.scoring_workers = scoring_workers or os.cpu_count() or 1
+        self.score_batch_size = score_batch_size
+        self.score_batch_wait = score_batch_wait
+        self.min_relevance = min_relevance
+        self.seen_pairs = set()
+        self.youtube_cache: Dict[str, asyncio.Task] = {}
+        self.stats = {'memes': 0, 'terms': 0, 'matches': 0, 'refreshed': 0, 'scored': 0}
+
+    async def extract_terms(self, meme: Dict) -> List[Dict]:
+        self.stats['memes'] += 1
+        terms = await asyncio.to_thread(self.searcher.extract_searchable_terms, meme)
+        self.stats['terms'] += len(terms)
+        return [{'meme': meme, 'term': term, 'weight': weight} for term, weight in terms]
+
+    def search_and_match(self, meme: Dict, term: str, weight: float) -> List[Dict]:
+        pairs = self.searcher.search_dexscreener(term)
+        return self.searcher.match_pairs(meme, term, weight, pairs, self.min_relevance, skip=self.seen_pairs)
+
+    async def search_term(self, job: Dict) -> List[Dict]:
+        meme, term, weight = job['meme'], job['term'], job['weight']
+        # Relevance scoring is CPU-bound, so it runs in the worker thread with the search
+        found = await asyncio.to_thread(self.search_and_match, meme, term, weight)
+        matches = []
+        for match in found:
+            # Another term may have claimed the pair while this one was in the thread
+            key = (match['chain'], match['pair_address'])
+            if key in self.seen_pairs:
+                continue
+            self.seen_pairs.add(key)
+            match['_meme'] = meme
+            matches.append(match)
+        self.stats['matches'] += len(matches)
+        return matches
+
+    async def refresh_pair(self, match: Dict) -> List[Dict]:
+        coin = await process_coin(self.dex_api, match)
+        if not coin:
+            return []
+        self.stats['refreshed'] += 1
+        coin['_meme'] = match['_meme']
+        return [coin]
+
+    async def score_stage(self, inbox: asyncio.Queue, outbox: asyncio.Queue, executor: ProcessPoolExecutor):
+        """Collect refreshed coins into micro-batches and score them in the process pool."""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.scoring_workers)
+        tasks = []
+
+        async def score(batch):
+            memes = [coin.pop('_meme') for coin in batch]
+            try:
+                scored = await loop.run_in_executor(executor, score_coins, batch)
+            finally:
+                slots.release()
+            by_pair = {coin['pair_address']: meme for coin, meme in zip(batch, memes)}
+            for coin in scored:
+                coin['_meme'] = by_pair.get(coin['pair_address'], {})
+                self.stats['scored'] += 1
+                await outbox.put(coin)
+
+        batch = []
+        done = False
+        while not done:
+            try:
+                item = await (asyncio.wait_for(inbox.get(), self.score_batch_wait) if batch else inbox.get())
+            except asyncio.TimeoutError:
+                item = None
+            if item is _DONE:
+                done = True
+            elif item is not None:
+                batch.append(item)
+            if batch and (done or item is None or len(batch) >= self.score_batch_size):
+                await slots.acquire()
+                tasks.append(asyncio.create_task(score(batch)))
+                batch = []
+
+        await asyncio.gather(*tasks)
+        await outbox.put(_DONE)
+
+    async def enrich(self, coin: Dict) -> List[Dict]:
+        meme = coin.pop('_meme', {})
+        if self.checker and meme.get('name'):
+            name = meme['name']
+            if name not in self.youtube_cache:
+                # One YouTube lookup per meme, shared by every coin riding it
+                self.youtube_cache[name] = asyncio.create_task(asyncio.to_thread(
+                    self.checker.process_meme, meme, len(self.youtube_cache) + 1, self.stats['memes']))
+            youtube = await self.youtube_cache[name]
+            coin['youtube_metrics'] = youtube['youtube_metrics'] if youtube else None
+        coin['total_score'] = (coin['viral_score'] + coin['views_score']) / 2
+        return [coin]
+
+    async def run(self, memes: List[Dict]) -> List[Dict]:
+        """Run all stages concurrently and return coins ranked by total score."""
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(5)]
+        meme_queue, term_queue, match_queue, refreshed_queue, scored_queue = queues
+        ranked: List[Dict] = []
+
+        async def feed():
+            for meme in memes:
+                await meme_queue.put(meme)
+            await meme_queue.put(_DONE)
+
+        async def collect(coin):
+            ranked.append(coin)
+            return None
+
+        enriched_queue = asyncio.Queue(maxsize=self.queue_size)
+        with ProcessPoolExecutor(max_workers=self.scoring_workers) as executor:
+            await asyncio.gather(
+                feed(),
+                run_stage('term extraction', meme_queue, term_queue, self.extract_terms, 1),
+                run_stage('search', term_queue, match_queue, self.search_term, self.search_workers),
+                run_stage('pair refresh', match_queue, refreshed_queue, self.refresh_pair, self.refresh_workers),
+                self.score_stage(refreshed_queue, scored_queue, executor),
+                run_stage('youtube', scored_queue, enriched_queue, self.enrich, self.youtube_workers),
+                run_stage('collect', enriched_queue, None, collect, 1)
+            )
+        await self.dex_api.close_session()
+
+        ranked.sort(key=lambda coin: coin['total_score'], reverse=True)
+        for rank, coin in enumerate(ranked, 1):
+            coin['rank'] = rank
+        return ranked
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run the full meme -> token -> YouTube pipeline")
+    parser.add_argument('memes_file', help="KYM export with a top-level 'memes' list")
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--youtube', action='store_true', help="Enrich with YouTube (needs YOUTUBE_API_KEY)")
+    parser.add_argument('--output', help="Write the ranking as JSON to this file")
+    args = parser.parse_args()
+
+    with open(args.memes_file, 'r', encoding='utf-8') as f:
+        memes = json.load(f).get('memes', [])[:args.limit]
+
+    checker = None
+    if args.youtube:
+        from yt import YoutubeMemeChecker
+        checker = YoutubeMemeChecker(os.environ.get('YOUTUBE_API_KEY', ''))
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    searcher = ImprovedTokenSearcher(term_memo_path=os.path.join(script_dir, "meme_analysis", "term_memo.json"),
+                                     rejection_filter_path=os.path.join(script_dir, "meme_analysis",
+                                                                        "rejected_pairs.json"))
+    searcher.debug_mode = False
+    pipeline = MemeTokenPipeline(searcher=searcher, checker=checker)
+    try:
+        ranked = await pipeline.run(memes)
+    finally:
+        await close_async_clients()
+    searcher.save_term_memo()
+    searcher.save_rejection_filter()
+    print(f"\nPipeline stats: {pipeline.stats}")
+
+    print("\nTop 10 Viral Coins:")
+    for coin in ranked[:10]:
+        print(f"\n#{coin['rank']} {coin['symbol']}")
+        print(f"Contract: {coin['address']}")
+        print(f"Meme Name: {coin.get('meme_name', 'N/A')}")
+        print(f"Total Score: {coin['total_score']:.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(ranked, f, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
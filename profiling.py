@@ -0,0 +1,147 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+class StageProfiler:
+    """Per-stage cProfile plus a sampling profiler that writes collapsed stacks for flamegraphs.
+
+    cProfile only sees the thread that enters a stage; the sampler walks every thread's stack, so
+    worker threads (YouTube fetches, to_thread calls) still show up in the flamegraph. Processes
+    in a ProcessPoolExecutor are not profiled.
+    """
+
+    def __init__(self, name: str, output_dir: Optional[str] = None, enabled: bool = True,
+                 sample_interval: float = 0.005):
+        self.name = name
+        self.enabled = enabled
+        if output_dir is None:
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            output_dir = os.path.join(script_dir, "profiles",
+                                      f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.samples: Dict[str, Counter] = defaultdict(Counter)
+        self.stage_times: Dict[str, float] = defaultdict(float)
+        self.loop_lag: List[Tuple[float, str, float]] = []
+        self.current_stage = 'untracked'
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @classmethod
+    def disabled(cls) -> 'StageProfiler':
+        return cls('disabled', output_dir='', enabled=False)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        previous = self.current_stage
+        self.current_stage = name
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        try:
+            profile.enable()
+            active = True
+        except ValueError:
+            active = False  # Another profiler is already running on this thread (nested stage)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] += time.perf_counter() - started
+            if active:
+                profile.disable()
+            self.current_stage = previous
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            stage = self.current_stage
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self.samples[stage][';'.join(reversed(stack))] += 1
+
+    def start(self) -> 'StageProfiler':
+        if self.enabled and self._sampler is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._sampler = threading.Thread(target=self._sample, name='stage-sampler', daemon=True)
+            self._sampler.start()
+        return self
+
+    async def monitor_loop_lag(self, interval: float = 0.05, warn_after: float = 0.1):
+        """Sample event-loop lag: how late a sleep(interval) wakes up. Run as a background task."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lag = loop.time() - started - interval
+            self.loop_lag.append((time.time(), self.current_stage, lag))
+            if lag > warn_after:
+                print(f"[profile] event loop blocked {lag * 1000:.0f} ms during '{self.current_stage}'")
+
+    @contextmanager
+    def watching_loop(self):
+        """Run monitor_loop_lag for the duration of the block (inside a running loop)."""
+        if not self.enabled:
+            yield
+            return
+        task = asyncio.get_running_loop().create_task(self.monitor_loop_lag())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    def stop(self):
+        """Stop sampling and write .prof, .collapsed and loop-lag files to output_dir."""
+        if not self.enabled:
+            return
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        for stage, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(self.output_dir, f"{stage}.prof"))
+        all_stacks = Counter()
+        for stage, stacks in self.samples.items():
+            with open(os.path.join(self.output_dir, f"{stage}.collapsed"), 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            all_stacks.update({f"{stage};{stack}": count for stack, count in stacks.items()})
+        with open(os.path.join(self.output_dir, "all_stages.collapsed"), 'w', encoding='utf-8') as f:
+            for stack, count in all_stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        if self.loop_lag:
+            with open(os.path.join(self.output_dir, "loop_lag.csv"), 'w', encoding='utf-8') as f:
+                f.write("timestamp,stage,lag_ms\n")
+                for ts, stage, lag in self.loop_lag:
+                    f.write(f"{ts:.3f},{stage},{lag * 1000:.2f}\n")
+
+        print(f"\n[profile] Stage timings ({self.name}):")
+        for stage, seconds in self.stage_times.items():
+            print(f"  {stage:<24} {seconds:8.2f}s")
+            stats = pstats.Stats(self.profiles[stage])
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:3]
+            for (filename, _, func), (_, _, _, cumulative, _) in top:
+                print(f"    {os.path.basename(filename)}:{func} {cumulative:.2f}s cumulative")
+        if self.loop_lag:
+            lags = sorted(lag for _, _, lag in self.loop_lag)
+            print(f"  event loop lag p50 {lags[len(lags) // 2] * 1000:.1f} ms, max {lags[-1] * 1000:.1f} ms")
+        print(f"[profile] Profiles and flamegraph stacks written to: {self.output_dir}")
@@ -0,0 +1,105 @@
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List
+
+
+class AgingBloomFilter:
+    """Persisted Bloom filter whose entries expire after roughly generations * generation_hours.
+
+    Adds go into the newest generation. A lookup checks every generation, and the oldest one is
+    dropped each time a new generation starts, so a pair that later improves can come back.
+    """
+
+    def __init__(self, file_path: str, capacity: int = 200000, error_rate: float = 0.001,
+                 generations: int = 4, generation_hours: float = 48):
+        self.file_path = file_path
+        self.generations = generations
+        self.generation_seconds = generation_hours * 3600
+        # Standard sizing for `capacity` keys per generation at `error_rate` false positives
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._lock = threading.Lock()
+        self.slices: List[Dict] = []
+        self.stats = {'rejected': 0, 'added': 0}
+        self.load()
+        self._rotate()
+
+    def _new_slice(self, started: float) -> Dict:
+        return {'started': started, 'bits': bytearray((self.num_bits + 7) // 8)}
+
+    def _rotate(self):
+        now = time.time()
+        if self.slices and now - self.slices[-1]['started'] < self.generation_seconds:
+            return
+        with self._lock:
+            if not self.slices or now - self.slices[-1]['started'] >= self.generation_seconds * self.generations:
+                self.slices = [self._new_slice(now)]
+                return
+            while now - self.slices[-1]['started'] >= self.generation_seconds:
+                self.slices.append(self._new_slice(self.slices[-1]['started'] + self.generation_seconds))
+            self.slices = self.slices[-self.generations:]
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        self._rotate()
+        positions = self._positions(key)
+        with self._lock:
+            bits = self.slices[-1]['bits']
+            for position in positions:
+                bits[position >> 3] |= 1 << (position & 7)
+            self.stats['added'] += 1
+
+    def __contains__(self, key: str) -> bool:
+        self._rotate()
+        positions = self._positions(key)
+        for generation in self.slices:
+            bits = generation['bits']
+            if all(bits[position >> 3] & (1 << (position & 7)) for position in positions):
+                self.stats['rejected'] += 1
+                return True
+        return False
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('num_bits') != self.num_bits or data.get('num_hashes') != self.num_hashes:
+                print("Rejection filter sizing changed; starting empty")
+                return
+            self.slices = [{'started': entry['started'],
+                            'bits': bytearray(zlib.decompress(base64.b64decode(entry['bits'])))}
+                           for entry in data.get('slices', [])]
+        except Exception as e:
+            print(f"Error loading rejection filter: {str(e)}")
+            self.slices = []
+
+    def save(self):
+        self._rotate()
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+                tmp_path = f"{self.file_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'num_bits': self.num_bits,
+                        'num_hashes': self.num_hashes,
+                        'slices': [{'started': entry['started'],
+                                    'bits': base64.b64encode(zlib.compress(bytes(entry['bits']))).decode('ascii')}
+                                   for entry in self.slices]
+                    }, f)
+                os.replace(tmp_path, self.file_path)
+            except Exception as e:
+                print(f"Error saving rejection filter: {str(e)}")
@@ -1,13 +1,30 @@
-import requests
+from dex_client import DEFAULT_BASE_URL, sync_get
+from dex_schema import BaseToken, Pair, decode_pairs, to_pair
+from profiling import StageProfiler
+from meme_store import MemeStore
+from term_memo import TermMemo, config_version, content_key
+from rejection_filter import AgingBloomFilter
+from pair_dedup import canonical_search_pairs
 from datetime import datetime, timezone
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Union, Optional
 import time 
+import os
 import re
+import sys
+import json
+import argparse
 from difflib import SequenceMatcher
 
 class ImprovedTokenSearcher:
-    def __init__(self):
-        self.dexscreener_base_url = "https://api.dexscreener.com/latest/dex"
+    # Bump when extract_searchable_terms / extract_meaningful_phrases logic changes
+    TERM_EXTRACTION_VERSION = 1
+    
+    def __init__(self, term_memo_path: Optional[str] = None, rejection_filter_path: Optional[str] = None):
+        self.dexscreener_base_url = DEFAULT_BASE_URL
+        self.term_memo_path = term_memo_path
+        self.term_memo: Optional[TermMemo] = None
+        # Pairs rejected as spam or dead on a recent run, skipped right after decoding
+        self.rejected = AgingBloomFilter(rejection_filter_path) if rejection_filter_path else None
         # Expanded stop words to catch more common terms
         self.stop_words = {
             'the', 'and', 'or', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
@@ -55,6 +72,9 @@ class ImprovedTokenSearcher:
             'market_cap': 200000    
 
         }
+        # Pairs younger than this can still be growing into the minimums above, so failing
+        # them is not grounds for the multi-day rejection filter
+        self.min_rejection_age_days = 7
         
        
         # Add market cap to market weights
@@ -131,7 +151,32 @@ class ImprovedTokenSearcher:
         text = ' '.join(text.split())
         return text
 
+    def extraction_config_version(self) -> str:
+        return config_version(self.TERM_EXTRACTION_VERSION, self.stop_words,
+                              self.spam_indicators, self.term_weights)
+
+    def save_term_memo(self):
+        if self.term_memo:
+            self.term_memo.save()
+
     def extract_searchable_terms(self, meme_entry: Dict) -> List[Tuple[str, float]]:
+        """Extract terms, reusing memoized results for unchanged memes when term_memo_path is set"""
+        if not self.term_memo_path:
+            return self._extract_searchable_terms(meme_entry)
+        if self.term_memo is None:
+            # Opened on first use so the version reflects any config changes made after __init__
+            self.term_memo = TermMemo(self.term_memo_path, self.extraction_config_version())
+        key = content_key(meme_entry)
+        cached = self.term_memo.get(key)
+        if cached is not None:
+            if name := meme_entry.get('name'):
+                print(f"\nProcessing meme: {name} (memoized terms)")
+            return cached
+        terms = self._extract_searchable_terms(meme_entry)
+        self.term_memo.put(key, terms)
+        return terms
+
+    def _extract_searchable_terms(self, meme_entry: Dict) -> List[Tuple[str, float]]:
         """Extract terms with improved filtering"""
         terms = {}
         
@@ -234,20 +279,64 @@ class ImprovedTokenSearcher:
     def create_ngrams(self, text: str, n: int) -> Set[str]:
         text = re.sub(r'[^\w\s]', '', text.lower())
         return set(text[i:i+n] for i in range(len(text) - n + 1))
-    def search_dexscreener(self, search_term: str) -> List[Dict]:
-        url = f"{self.dexscreener_base_url}/search/?q={search_term}"
+    def rejection_keys(self, token_data: Union[Pair, Dict]) -> Tuple[str, str]:
+        """Filter keys for the pair itself and for its base token"""
+        if isinstance(token_data, dict):
+            chain, pair_address = token_data.get('chainId', ''), token_data.get('pairAddress', '')
+            token_address = (token_data.get('baseToken') or {}).get('address', '')
+        else:
+            chain, pair_address = token_data.chainId, token_data.pairAddress
+            token_address = token_data.baseToken.address if token_data.baseToken else ''
+        return f"pair:{chain}:{pair_address}", f"token:{chain}:{token_address}"
+
+    def is_rejected(self, token_data: Union[Pair, Dict]) -> bool:
+        if not self.rejected:
+            return False
+        pair_key, token_key = self.rejection_keys(token_data)
+        return pair_key in self.rejected or token_key in self.rejected
+
+    def drop_rejected(self, pairs: list) -> list:
+        if not self.rejected:
+            return pairs
+        kept = [pair for pair in pairs if not self.is_rejected(pair)]
+        if len(kept) < len(pairs):
+            print(f"Skipped {len(pairs) - len(kept)} previously rejected pairs")
+        return kept
+
+    def save_rejection_filter(self):
+        if self.rejected:
+            self.rejected.save()
+
+    def search_dexscreener(self, search_term: str) -> List[Pair]:
+        """Search DexScreener and decode only the fields used for scoring"""
+        url = f"{self.dexscreener_base_url}/search/"
         try:
-            response = requests.get(url)
+            response = sync_get(url, params={'q': search_term})
             response.raise_for_status()
-            pairs = response.json().get('pairs', [])
+            pairs = decode_pairs(response.content)
             print(f"Found {len(pairs)} pairs for search term '{search_term}'")
-            return pairs
+            return self.drop_rejected(pairs)
         except Exception as e:
             print(f"Error searching DexScreener: {e}")
             return []
 
+    def match_pairs(self, meme: Dict, search_term: str, term_weight: float, pairs: List[Pair],
+                    min_score: float, skip: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """Match records for one token per (chain, base token) scoring at least min_score.
+
+        Pairs whose (chainId, pairAddress) is in skip are left out; skip itself is not updated.
+        """
+        matches = []
+        for pair, alternatives in canonical_search_pairs(pairs):
+            if skip and (pair.chainId, pair.pairAddress) in skip:
+                continue
+            score = self.analyze_token_relevance(pair, search_term, term_weight, meme)
+            if score < min_score:
+                continue
+            matches.append(self.build_match(meme, pair, search_term, score, alternatives))
+        return matches
 
-    def analyze_market_metrics(self, token_data: Dict) -> Tuple[float, Dict]:
+    def analyze_market_metrics(self, token_data: Union[Pair, Dict]) -> Tuple[float, Dict]:
         """Enhanced market metrics analysis including market cap"""
         score = 0.0
         feedback = {
@@ -272,18 +361,18 @@ class ImprovedTokenSearcher:
         
         try:
             # Get basic metrics
-            liquidity_usd = float(token_data.get('liquidity', {}).get('usd', 0))
-            volume_data = token_data.get('volume', {})
-            volume_24h = float(volume_data.get('h24', 0))
-            volume_6h = float(volume_data.get('h6', 0))
-            volume_1h = float(volume_data.get('h1', 0))
+            pair = to_pair(token_data)
+            liquidity_usd = pair.liquidity_usd
+            volume_24h = pair.volume_at('h24')
+            volume_6h = pair.volume_at('h6')
+            volume_1h = pair.volume_at('h1')
             
             # Calculate market cap with FDV fallback
-            price_usd = float(token_data.get('priceUsd', 0))
-            market_cap = float(token_data.get('fdv', 0))  # Try FDV first
+            price_usd = pair.price_usd
+            market_cap = pair.fdv or 0.0  # Try FDV first
             
             if not market_cap:  # If FDV not available, calculate from total supply
-                total_supply = float(token_data.get('baseToken', {}).get('totalSupply', 0))
+                total_supply = pair.total_supply
                 market_cap = price_usd * total_supply if price_usd and total_supply else 0
             
             # Check market cap
@@ -319,14 +408,12 @@ class ImprovedTokenSearcher:
                         feedback['volume']['score'] += self.market_weights['volume']['weight']
             
             # Record price data but don't score it
-            current_price = float(token_data.get('priceUsd', 0))
-            price_changes = token_data.get('priceChange', {})
             feedback['price'].update({
-                'current': current_price,
+                'current': price_usd,
                 'changes': {
-                    'h1': float(price_changes.get('h1', 0)),
-                    'h6': float(price_changes.get('h6', 0)),
-                    'h24': float(price_changes.get('h24', 0))
+                    'h1': pair.price_change_at('h1'),
+                    'h6': pair.price_change_at('h6'),
+                    'h24': pair.price_change_at('h24')
                 }
             })
             
@@ -340,19 +427,24 @@ class ImprovedTokenSearcher:
             
         except Exception as e:
             print(f"Error in market analysis: {e}")
+            feedback['error'] = str(e)
             return 0.0, feedback
         
         return float(score), feedback
-    def analyze_token_relevance(self, token_data: Dict, search_term: str, term_weight: float, meme_data: Dict) -> float:
+    def analyze_token_relevance(self, token_data: Union[Pair, Dict], search_term: str, term_weight: float,
+                                meme_data: Dict) -> float:
         """Calculate token relevance score with proper type handling"""
-        token_name = token_data.get('baseToken', {}).get('name', '')
-        token_symbol = token_data.get('baseToken', {}).get('symbol', '')
+        token_data = to_pair(token_data)
+        token_name = token_data.baseToken.name if token_data.baseToken else ''
+        token_symbol = token_data.baseToken.symbol if token_data.baseToken else ''
         
         if not token_name or not token_symbol:
             return 0.0
             
         # Initial filtering
         if self.is_spam_token(token_name, token_symbol):
+            if self.rejected:
+                self.rejected.add(self.rejection_keys(token_data)[1])
             return 0.0
             
         # Match scoring
@@ -361,7 +453,10 @@ class ImprovedTokenSearcher:
             return 0.0
             
         # Add market metrics - ensure we're getting just the score
-        market_score, _ = self.analyze_market_metrics(token_data)
+        market_score, feedback = self.analyze_market_metrics(token_data)
+        if self.rejected and 'error' not in feedback and self.is_dead_pair(token_data, feedback):
+            # Below every minimum: unqualified for any search term until the filter ages it out
+            self.rejected.add(self.rejection_keys(token_data)[0])
         final_score = match_score + market_score
         
         # Add temporal relevance
@@ -369,6 +464,40 @@ class ImprovedTokenSearcher:
         final_score += temporal_score
         
         return max(0, final_score)
+    def is_dead_pair(self, pair: Pair, feedback: Dict) -> bool:
+        """Failed every market minimum despite being old enough to have met them"""
+        if any(feedback[metric]['status'] != 'fail' for metric in ('market_cap', 'liquidity', 'volume')):
+            return False
+        if not pair.pairCreatedAt:
+            return False
+        created = pair.pairCreatedAt / 1000 if pair.pairCreatedAt > 9999999999 else pair.pairCreatedAt
+        return time.time() - created >= self.min_rejection_age_days * 86400
+
+    def build_match(self, meme: Dict, token_data: Union[Pair, Dict], search_term: str, score: float,
+                    alternatives: Optional[List[Dict]] = None) -> Dict:
+        """Match record in the meme_coins_FINAL_*.json shape consumed by rank_meme_coins"""
+        pair = to_pair(token_data)
+        base_token = pair.baseToken or BaseToken()
+        return {
+            'name': meme.get('name', ''),
+            'url': meme.get('url', ''),
+            'tags': meme.get('tags', []),
+            'views': meme.get('views', 0),
+            'videos_count': meme.get('videos_count', 0),
+            'images_count': meme.get('images_count', 0),
+            'comments_count': meme.get('comments_count', 0),
+            'token': base_token.name,
+            'symbol': base_token.symbol,
+            'address': base_token.address,
+            'pair_address': pair.pairAddress,
+            'chain': pair.chainId,
+            'dex': pair.dexId,
+            'created_at': pair.pairCreatedAt,
+            'liquidity_usd': pair.liquidity_usd,
+            'alternative_pairs': alternatives or [],
+            'search_term': search_term,
+            'score': score
+        }
     def is_spam_token(self, name: str, symbol: str) -> bool:
         """Check if token appears to be spam"""
         name_lower = name.lower()
@@ -392,12 +521,12 @@ class ImprovedTokenSearcher:
         return any(re.search(pattern, name) for pattern in suspicious_patterns)
 
 
-    def analyze_temporal_relevance(self, token_data: Dict, meme_data: Dict) -> float:
+    def analyze_temporal_relevance(self, token_data: Union[Pair, Dict], meme_data: Dict) -> float:
         """
         Analyze temporal relevance between token creation and meme popularity.
         
         Args:
-            token_data (Dict): Token information from DexScreener
+            token_data (Pair): Token information from DexScreener
             meme_data (Dict): Meme information from KYM
             
         Returns:
@@ -407,7 +536,7 @@ class ImprovedTokenSearcher:
             score = 0.0
             
             # Get token creation timestamp with debug logging
-            created_timestamp = token_data.get('pairCreatedAt', '0')
+            created_timestamp = to_pair(token_data).pairCreatedAt or 0
             if self.debug_mode:
                 print(f"Raw timestamp value: {created_timestamp} (type: {type(created_timestamp)})")
             
@@ -704,3 +833,63 @@ class ImprovedTokenSearcher:
         return ''
     
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Match KYM memes to DexScreener tokens")
+    parser.add_argument('memes_file', help="KYM export with a top-level 'memes' list")
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--min-score', type=float, default=5.0)
+    parser.add_argument('--db', help="Also upsert matches into this MemeStore SQLite database")
+    parser.add_argument('--term-memo', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "meme_analysis", "term_memo.json"),
+                        help="Memoized term extraction results ('' to disable)")
+    parser.add_argument('--rejection-filter', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   "meme_analysis", "rejected_pairs.json"),
+                        help="Persisted filter of spam/dead pairs to skip ('' to disable)")
+    parser.add_argument('--profile', action='store_true', help="Write per-stage profiles and flamegraph stacks")
+    args = parser.parse_args()
+
+    profiler = StageProfiler('searchDex').start() if args.profile else StageProfiler.disabled()
+    searcher = ImprovedTokenSearcher(term_memo_path=args.term_memo or None,
+                                     rejection_filter_path=args.rejection_filter or None)
+    searcher.debug_mode = False
+    try:
+        with profiler.stage('load'):
+            with open(args.memes_file, 'r', encoding='utf-8') as f:
+                memes = json.load(f).get('memes', [])[:args.limit]
+
+        with profiler.stage('extract_terms'):
+            jobs = [(meme, term, weight) for meme in memes
+                    for term, weight in searcher.extract_searchable_terms(meme)]
+            searcher.save_term_memo()
+
+        matches = []
+        seen = set()
+        for meme, term, weight in jobs:
+            with profiler.stage('search'):
+                pairs = searcher.search_dexscreener(term)
+            with profiler.stage('analyze'):
+                found = searcher.match_pairs(meme, term, weight, pairs, args.min_score, skip=seen)
+                seen.update((match['chain'], match['pair_address']) for match in found)
+                matches.extend(found)
+
+        with profiler.stage('save'):
+            output_file = f"meme_coins_FINAL_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump({'memes_processed': len(memes), 'matches': matches}, f, indent=2, ensure_ascii=False)
+            if args.db:
+                store = MemeStore(args.db)
+                store.start_run('search', len(memes))
+                store.upsert_matches(matches)
+                store.close()
+        print(f"Found {len(matches)} matches for {len(memes)} memes, saved to: {output_file}")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        sys.exit(1)
+    finally:
+        searcher.save_rejection_filter()
+        profiler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from pair_dedup import canonical_matches, token_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    num_shards INTEGER NOT NULL,
+    memes_processed INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    job TEXT NOT NULL REFERENCES jobs (id),
+    shard INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    results TEXT,
+    error TEXT,
+    PRIMARY KEY (job, shard)
+);
+CREATE INDEX IF NOT EXISTS shards_status ON shards (job, status, lease_expires);
+"""
+
+
+def shard_of(key: str, num_shards: int) -> int:
+    """Stable across processes and machines (unlike hash(), which is salted per interpreter)."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % num_shards
+
+
+def pair_key(match: Dict) -> str:
+    return f"{match.get('chain', '')}:{match.get('pair_address', '')}"
+
+
+def match_token_key(match: Dict) -> str:
+    """Shard rank jobs by base token so all of a token's pairs meet in one shard for deduplication."""
+    if not match.get('address'):
+        return pair_key(match)
+    return ':'.join(token_key(match.get('chain'), match.get('address')))
+
+
+def meme_key(meme: Dict) -> str:
+    return (meme.get('name') or '').strip().lower()
+
+
+class LeaseLost(Exception):
+    """The shard's lease expired and another worker claimed it."""
+
+
+class ShardQueue:
+    """Work queue in a SQLite file: shards are claimed with a lease, and expired leases are re-claimed.
+
+    A shard that has been claimed max_attempts times without completing (its worker raised or died)
+    is marked 'failed' instead of being handed out again.
+
+    Workers on several machines can share one queue file when it sits on a filesystem with working
+    POSIX locks; no broker is needed.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 300, max_attempts: int = 3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Queue files created before shards had an error column
+        if 'error' not in [row['name'] for row in self.conn.execute("PRAGMA table_info(shards)")]:
+            self.conn.execute("ALTER TABLE shards ADD COLUMN error TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, fn: Callable[[], object]):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn()
+            self.conn.execute("COMMIT")
+            return result
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def submit(self, job_id: str, kind: str, items: List[Dict], num_shards: int,
+               key: Callable[[Dict], str], memes_processed: Optional[int] = None) -> List[int]:
+        """Partition items by stable hash of key(item) and enqueue one row per non-empty shard."""
+        partitions: Dict[int, List[Dict]] = {}
+        for item in items:
+            partitions.setdefault(shard_of(key(item), num_shards), []).append(item)
+
+        def insert():
+            self.conn.execute("INSERT INTO jobs (id, kind, num_shards, memes_processed, created_at) "
+                              "VALUES (?, ?, ?, ?, ?)", (job_id, kind, num_shards, memes_processed, time.time()))
+            self.conn.executemany("INSERT INTO shards (job, shard, payload) VALUES (?, ?, ?)",
+                                  [(job_id, shard, json.dumps(part)) for shard, part in sorted(partitions.items())])
+        self._transaction(insert)
+        return sorted(partitions)
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, worker_id: str, job_id: Optional[str] = None) -> Optional[Tuple[str, str, int, List[Dict]]]:
+        """Lease the next pending (or expired) shard: (job, kind, shard, items), or None."""
+        def pick():
+            now = time.time()
+            # An expired lease on the last allowed attempt means its worker died every time
+            self.conn.execute(
+                "UPDATE shards SET status = 'failed', lease_expires = NULL, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ? AND (? IS NULL OR job = ?)",
+                (now, self.max_attempts, job_id, job_id))
+            row = self.conn.execute(
+                "SELECT s.job, j.kind, s.shard, s.payload FROM shards s JOIN jobs j ON j.id = s.job "
+                "WHERE (s.status = 'pending' OR (s.status = 'leased' AND s.lease_expires < ?)) "
+                "AND (? IS NULL OR s.job = ?) ORDER BY j.created_at, s.attempts, s.shard LIMIT 1",
+                (now, job_id, job_id)).fetchone()
+            if not row:
+                return None
+            self.conn.execute("UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, "
+                              "attempts = attempts + 1 WHERE job = ? AND shard = ?",
+                              (worker_id, now + self.lease_seconds, row['job'], row['shard']))
+            return row['job'], row['kind'], row['shard'], json.loads(row['payload'])
+        return self._transaction(pick)
+
+    def renew(self, worker_id: str, job_id: str, shard: int):
+        """Extend our lease; raises LeaseLost if another worker has taken the shard over."""
+        cursor = self.conn.execute(
+            "UPDATE shards SET lease_expires = ? WHERE job = ? AND shard = ? AND status = 'leased' AND worker = ?",
+            (time.time() + self.lease_seconds, job_id, shard, worker_id))
+        if cursor.rowcount != 1:
+            raise LeaseLost(f"{job_id}/{shard}")
+
+    def complete(self, worker_id: str, job_id: str, shard: int, results: List[Dict]) -> bool:
+        """Store a shard's results if we still hold its lease; False means they were discarded."""
+        cursor = self.conn.execute(
+            "UPDATE shards SET status = 'done', results = ?, lease_expires = NULL "
+            "WHERE job = ? AND shard = ? AND status = 'leased' AND worker = ?",
+            (json.dumps(results, default=str), job_id, shard, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, worker_id: str, job_id: str, shard: int, error: str) -> Optional[str]:
+        """Give a shard back after an error: 'pending' to retry, or 'failed' once out of attempts."""
+        def release():
+            cursor = self.conn.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_expires = NULL, error = ? "
+                "WHERE job = ? AND shard = ? AND status = 'leased' AND worker = ?",
+                (self.max_attempts, error, job_id, shard, worker_id))
+            if cursor.rowcount != 1:
+                return None
+            return self.conn.execute("SELECT status FROM shards WHERE job = ? AND shard = ?",
+                                     (job_id, shard)).fetchone()['status']
+        return self._transaction(release)
+
+    def failures(self, job_id: str) -> List[Dict]:
+        """Failed shards with their attempt count and last error."""
+        rows = self.conn.execute("SELECT shard, attempts, error FROM shards WHERE job = ? AND status = 'failed' "
+                                 "ORDER BY shard", (job_id,))
+        return [dict(row) for row in rows]
+
+    def retry_failed(self, job_id: str) -> int:
+        """Put a job's failed shards back in the queue with fresh attempts."""
+        cursor = self.conn.execute("UPDATE shards SET status = 'pending', attempts = 0, worker = NULL, error = NULL "
+                                   "WHERE job = ? AND status = 'failed'", (job_id,))
+        return cursor.rowcount
+
+    def leased(self, job_id: Optional[str] = None) -> int:
+        """Shards currently leased by some worker (they come back if that worker dies)."""
+        return self.conn.execute("SELECT COUNT(*) FROM shards WHERE status = 'leased' AND (? IS NULL OR job = ?)",
+                                 (job_id, job_id)).fetchone()[0]
+
+    def status(self, job_id: str) -> Dict[str, int]:
+        now = time.time()
+        counts = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0, 'failed': 0}
+        for row in self.conn.execute("SELECT status, lease_expires FROM shards WHERE job = ?", (job_id,)):
+            if row['status'] == 'leased' and row['lease_expires'] < now:
+                counts['expired'] += 1
+            else:
+                counts[row['status']] += 1
+        return counts
+
+    def results(self, job_id: str) -> List[Dict]:
+        rows = self.conn.execute("SELECT results FROM shards WHERE job = ? AND status = 'done' ORDER BY shard",
+                                 (job_id,))
+        return [item for row in rows for item in json.loads(row['results'] or '[]')]
+
+
+def search_shard(memes: List[Dict], renew: Callable[[], None], min_score: float = 5.0) -> List[Dict]:
+    """Searcher over one shard of memes."""
+    from searchDex import ImprovedTokenSearcher
+    searcher = ImprovedTokenSearcher()
+    searcher.debug_mode = False
+    matches = []
+    seen = set()
+    for meme in memes:
+        renew()
+        for term, weight in searcher.extract_searchable_terms(meme):
+            found = searcher.match_pairs(meme, term, weight, searcher.search_dexscreener(term), min_score, skip=seen)
+            seen.update((match['chain'], match['pair_address']) for match in found)
+            matches.extend(found)
+    return matches
+
+
+async def _rank_shard(matches: List[Dict], renew: Callable[[], None], base_url: Optional[str]) -> List[Dict]:
+    from dex_client import close_async_clients
+    from meme_token_updater import DexScreenerAPI, process_coin, score_coins
+    dex_api = DexScreenerAPI(base_url) if base_url else DexScreenerAPI()
+    matches = canonical_matches(matches)
+    coins = []
+    batch_size = 50
+    try:
+        for i in range(0, len(matches), batch_size):
+            renew()
+            results = await asyncio.gather(*[process_coin(dex_api, match) for match in matches[i:i + batch_size]])
+            fetched = [r for r in results if r is not None]
+            if fetched:
+                coins.extend(score_coins(fetched))
+    finally:
+        await dex_api.close_session()
+        await close_async_clients()
+    return coins
+
+
+def rank_shard(matches: List[Dict], renew: Callable[[], None], base_url: Optional[str] = None) -> List[Dict]:
+    """Fetch and score one shard of matches. The market cap index is per-process, so it is not used here."""
+    return asyncio.run(_rank_shard(matches, renew, base_url))
+
+
+def run_worker(queue_path: str, job_id: Optional[str] = None, worker_id: Optional[str] = None,
+               lease_seconds: float = 300, poll_seconds: float = 5.0, base_url: Optional[str] = None,
+               min_score: float = 5.0, max_attempts: int = 3) -> int:
+    """Claim and process shards until the job has none left; returns the number of shards completed."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queue = ShardQueue(queue_path, lease_seconds, max_attempts)
+    completed = 0
+    try:
+        while True:
+            claimed = queue.claim(worker_id, job_id)
+            if not claimed:
+                # Leased shards may still come back if their worker dies, so wait out their leases
+                if queue.leased(job_id):
+                    time.sleep(poll_seconds)
+                    continue
+                return completed
+            shard_job, kind, shard, items = claimed
+            print(f"[{worker_id}] {shard_job} shard {shard}: {len(items)} items")
+
+            def renew():
+                queue.renew(worker_id, shard_job, shard)
+
+            try:
+                if kind == 'search':
+                    results = search_shard(items, renew, min_score)
+                else:
+                    results = rank_shard(items, renew, base_url)
+            except LeaseLost:
+                print(f"[{worker_id}] Lost lease on {shard_job} shard {shard}, skipping")
+                continue
+            except Exception as e:
+                print(f"Error processing {shard_job} shard {shard}: {str(e)}")
+                if queue.fail(worker_id, shard_job, shard, f"{type(e).__name__}: {str(e)}") == 'failed':
+                    print(f"[{worker_id}] {shard_job} shard {shard} failed {max_attempts} times; giving up on it")
+                continue
+            if queue.complete(worker_id, shard_job, shard, results):
+                completed += 1
+    finally:
+        queue.close()
+
+
+def merge_job(queue_path: str, job_id: str, store_path: Optional[str] = None,
+              allow_failed: bool = False) -> Optional[str]:
+    """Merge a finished job's shard results into one global output file.
+
+    Failed shards block the merge unless allow_failed, in which case their items are left out.
+    """
+    queue = ShardQueue(queue_path)
+    try:
+        job = queue.job(job_id)
+        status = queue.status(job_id)
+        if not job:
+            print(f"Error: unknown job {job_id}")
+            return None
+        if status['done'] + status['failed'] != sum(status.values()):
+            print(f"Job {job_id} is not finished yet: {status}")
+            return None
+        if status['failed']:
+            for failure in queue.failures(job_id):
+                print(f"Shard {failure['shard']} failed after {failure['attempts']} attempts: {failure['error']}")
+            if not allow_failed:
+                print(f"Job {job_id} has {status['failed']} failed shards; run 'retry {job_id}' after fixing "
+                      f"the cause, or merge with --allow-failed to leave them out")
+                return None
+            print(f"Merging without {status['failed']} failed shards")
+        results = queue.results(job_id)
+    finally:
+        queue.close()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+    if job['kind'] == 'search':
+        # A pair can match memes from different shards; keep its best-scoring match
+        best: Dict[Tuple[str, str], Dict] = {}
+        for match in results:
+            key = (match.get('chain'), match.get('pair_address'))
+            if key not in best or match.get('score', 0) > best[key].get('score', 0):
+                best[key] = match
+        output_file = os.path.join(script_dir, f"meme_coins_FINAL_{timestamp}.json")
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump({'memes_processed': job['memes_processed'], 'matches': list(best.values())},
+                      f, indent=2, ensure_ascii=False)
+        if store_path:
+            from meme_store import MemeStore
+            store = MemeStore(store_path)
+            store.start_run('search', job['memes_processed'])
+            store.upsert_matches(list(best.values()))
+            store.close()
+        return output_file
+
+    import pandas as pd
+    from meme_token_updater import save_enhanced_results
+    coins = {pair_key(coin): coin for coin in results}
+    df = pd.DataFrame(list(coins.values()))
+    if df.empty:
+        print("No valid coins found in any shard")
+        return None
+    df['total_score'] = df[['viral_score', 'views_score']].mean(axis=1)
+    df.sort_values('total_score', ascending=False, inplace=True)
+    df['rank'] = range(1, len(df) + 1)
+    output_file = save_enhanced_results(df, queue_path, job['memes_processed'])
+    if store_path:
+        from meme_store import MemeStore
+        store = MemeStore(store_path)
+        store.upsert_coins(df.to_dict('records'), store.start_run('rank', job['memes_processed']))
+        store.close()
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded search/ranking over a shared SQLite work queue")
+    parser.add_argument('--queue', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        "meme_analysis", "shards.db"))
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    submit = sub.add_parser('submit', help="Partition an input file into shards")
+    submit.add_argument('kind', choices=['search', 'rank'])
+    submit.add_argument('input', help="KYM memes export (search) or meme_coins_FINAL_*.json (rank)")
+    submit.add_argument('--job', default=None)
+    submit.add_argument('--shards', type=int, default=32)
+
+    work = sub.add_parser('work', help="Claim and process shards")
+    work.add_argument('--job', default=None)
+    work.add_argument('--processes', type=int, default=1)
+    work.add_argument('--lease', type=float, default=300, help="Seconds before an unrenewed shard is re-claimed")
+    work.add_argument('--base-url', default=None)
+    work.add_argument('--min-score', type=float, default=5.0)
+    work.add_argument('--max-attempts', type=int, default=3, help="Claims before a shard is marked failed")
+
+    status = sub.add_parser('status')
+    status.add_argument('job')
+
+    retry = sub.add_parser('retry', help="Put a job's failed shards back in the queue")
+    retry.add_argument('job')
+
+    merge = sub.add_parser('merge', help="Merge shard results into one global ranking")
+    merge.add_argument('job')
+    merge.add_argument('--db', help="Also write the merged results to this MemeStore database")
+    merge.add_argument('--allow-failed', action='store_true', help="Merge even if some shards failed")
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        with open(args.input, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+        job_id = args.job or f"{args.kind}_{time.strftime('%Y%m%d_%H%M%S')}"
+        queue = ShardQueue(args.queue)
+        if args.kind == 'search':
+            items = data.get('memes', [])
+            shards = queue.submit(job_id, 'search', items, args.shards, meme_key, len(items))
+        else:
+            items = data.get('matches', [])
+            shards = queue.submit(job_id, 'rank', items, args.shards, match_token_key,
+                                  data.get('memes_processed', 0))
+        queue.close()
+        print(f"Submitted {job_id}: {len(items)} items in {len(shards)} shards")
+    elif args.command == 'work':
+        worker_args = (args.queue, args.job, None, args.lease, 5.0, args.base_url, args.min_score,
+                       args.max_attempts)
+        if args.processes == 1:
+            print(f"Completed {run_worker(*worker_args)} shards")
+        else:
+            processes = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+    elif args.command == 'status':
+        queue = ShardQueue(args.queue)
+        print(json.dumps(queue.status(args.job)))
+        for failure in queue.failures(args.job):
+            print(f"Shard {failure['shard']} failed after {failure['attempts']} attempts: {failure['error']}")
+        queue.close()
+    elif args.command == 'retry':
+        queue = ShardQueue(args.queue)
+        print(f"Re-queued {queue.retry_failed(args.job)} failed shards of {args.job}")
+        queue.close()
+    else:
+        output_file = merge_job(args.queue, args.job, args.db, args.allow_failed)
+        if output_file:
+            print(f"Merged results saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
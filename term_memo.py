@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+def content_key(meme_entry: Dict) -> str:
+    """Hash of the fields term extraction reads: name, tags and list_tags."""
+    content = [meme_entry.get('name') or '', meme_entry.get('tags') or [], meme_entry.get('list_tags') or []]
+    return hashlib.sha1(json.dumps(content, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def config_version(*parts) -> str:
+    """Stable hash of extraction settings; sets are sorted so ordering never changes the version."""
+    def normalize(value):
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in sorted(value.items())}
+        if isinstance(value, (set, frozenset)):
+            return sorted(normalize(v) for v in value)
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+    encoded = json.dumps([normalize(part) for part in parts], sort_keys=True)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+class TermMemo:
+    """Persistent extract_searchable_terms results keyed by meme content hash.
+
+    The file records the extraction config version it was built with; loading it under a different
+    version discards every entry.
+    """
+
+    def __init__(self, file_path: str, version: str, save_every: int = 500):
+        self.file_path = file_path
+        self.version = version
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.entries: Dict[str, List[List]] = {}
+        self.stats = {'hits': 0, 'misses': 0}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.version:
+                self.entries = data.get('entries', {})
+            else:
+                print("Term extraction config changed; discarding memoized terms")
+        except Exception as e:
+            print(f"Error loading term memo: {str(e)}")
+            self.entries = {}
+
+    def save(self):
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+                tmp_path = f"{self.file_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': self.version, 'entries': self.entries}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.file_path)
+                self._unsaved = 0
+            except Exception as e:
+                print(f"Error saving term memo: {str(e)}")
+
+    def get(self, key: str) -> Optional[List[Tuple[str, float]]]:
+        terms = self.entries.get(key)
+        if terms is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return [(term, weight) for term, weight in terms]
+
+    def put(self, key: str, terms: List[Tuple[str, float]]):
+        with self._lock:
+            self.entries[key] = [[term, weight] for term, weight in terms]
+            self._unsaved += 1
+            flush = self._unsaved >= self.save_every
+        if flush:
+            self.save()
@@ -0,0 +1,20 @@
+import os
+import sys
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def install_viral_stub():
+    """Stand in for the viral module, which is not part of this tree, unless the real one is importable."""
+    try:
+        import viral  # noqa: F401
+    except ImportError:
+        stub = types.ModuleType('viral')
+        stub.calculate_viral_score = lambda coin_info: 50.0
+        sys.modules['viral'] = stub
+
+
+install_viral_stub()
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+from conftest import REPO_ROOT, install_viral_stub
+from bench_pipeline import StandInThread
+from dex_standin import DexStandIn
+
+SMALL_UNIVERSE = 600
+LARGE_UNIVERSE = 2400
+MEMORY_BUDGET_MB = 0.25
+# Tags are carried from each match into its scored coin, so they make holding every coin expensive
+TAGS_PER_MATCH = 400
+
+
+def write_matches(path: str, pairs, seed: int = 7):
+    """NDJSON matches for every stand-in pair, written line by line."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'memes_processed': len(pairs)}) + '\n')
+        for i, pair in enumerate(pairs):
+            f.write(json.dumps({
+                'name': f"Meme {i}",
+                'token': pair['baseToken']['name'],
+                'symbol': pair['baseToken']['symbol'],
+                'address': pair['baseToken']['address'],
+                'pair_address': pair['pairAddress'],
+                'chain': pair['chainId'],
+                'dex': pair['dexId'],
+                'views': rng.randint(0, 10 ** 7),
+                'tags': [f"tag {i} {j} {rng.getrandbits(64):016x}" for j in range(TAGS_PER_MATCH)]
+            }) + '\n')
+
+
+def peak_rss_ranking(tmp_path, size: int) -> int:
+    """Peak RSS in bytes of a separate process running the chunked ranking over `size` tokens."""
+    work_dir = tmp_path / f"universe_{size}"
+    work_dir.mkdir()
+    standin = DexStandIn(num_pairs=size, seed=size)
+    matches_path = str(work_dir / 'matches.ndjson')
+    write_matches(matches_path, standin.pairs)
+    with StandInThread(standin) as server:
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), matches_path, server.base_url,
+                                 str(work_dir)], cwd=REPO_ROOT, capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-2000:]
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report['ranked'] > 0
+    return report['peak_rss']
+
+
+def test_chunked_ranking_memory_is_bounded(tmp_path):
+    small = peak_rss_ranking(tmp_path, SMALL_UNIVERSE)
+    large = peak_rss_ranking(tmp_path, LARGE_UNIVERSE)
+    # Holding every scored coin would cost about this much more for the larger universe
+    per_coin = TAGS_PER_MATCH * 80
+    unbounded_growth = (LARGE_UNIVERSE - SMALL_UNIVERSE) * per_coin
+    assert large - small < unbounded_growth / 4, (
+        f"peak RSS grew {(large - small) / 2 ** 20:.1f} MB from {SMALL_UNIVERSE} to {LARGE_UNIVERSE} tokens")
+
+
+def _rank_and_report(matches_path: str, base_url: str, work_dir: str):
+    install_viral_stub()
+    from dex_client import close_async_clients
+    from meme_token_updater import rank_meme_coins_chunked
+
+    async def rank():
+        try:
+            return await rank_meme_coins_chunked(
+                matches_path, memory_budget_mb=MEMORY_BUDGET_MB, top_n=100,
+                mcap_index_path=os.path.join(work_dir, 'market_cap_index.json'), scoring_workers=1,
+                base_url=base_url, output_dir=work_dir)
+        finally:
+            await close_async_clients()
+
+    df = asyncio.run(rank())
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    print(json.dumps({'ranked': len(df),
+                      'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale}))
+
+
+if __name__ == '__main__':
+    _rank_and_report(*sys.argv[1:4])
@@ -0,0 +1,127 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TZ = ZoneInfo('America/Los_Angeles')  # YouTube quota resets at midnight Pacific
+except Exception:
+    QUOTA_TZ = timezone.utc
+
+
+def quota_day(now: Optional[datetime] = None) -> str:
+    return (now or datetime.now(QUOTA_TZ)).astimezone(QUOTA_TZ).strftime('%Y-%m-%d')
+
+
+class QuotaLedger:
+    """Persistent per-day record of YouTube quota units spent, shared across restarts."""
+
+    def __init__(self, file_path: str, keep_days: int = 14):
+        self.file_path = file_path
+        self.keep_days = keep_days
+        self._lock = threading.Lock()
+        self.days: Dict[str, Dict[str, int]] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self.days = json.load(f).get('days', {})
+        except Exception as e:
+            print(f"Error loading quota ledger: {str(e)}")
+            self.days = {}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            for day in sorted(self.days)[:-self.keep_days]:
+                del self.days[day]
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'days': self.days}, f, indent=2)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            print(f"Error saving quota ledger: {str(e)}")
+
+    def charge(self, endpoint: str, units: int):
+        """Record units spent on an endpoint today and persist immediately."""
+        with self._lock:
+            today = self.days.setdefault(quota_day(), {'used': 0})
+            today['used'] += units
+            today[f"{endpoint}_calls"] = today.get(f"{endpoint}_calls", 0) + 1
+            today[f"{endpoint}_units"] = today.get(f"{endpoint}_units", 0) + units
+            self.save()
+
+    def today(self) -> Dict[str, int]:
+        return dict(self.days.get(quota_day(), {'used': 0}))
+
+    def used_today(self) -> int:
+        return self.today().get('used', 0)
+
+
+def meme_expected_value(meme: Dict, matched_names: Set[str], now: Optional[datetime] = None) -> float:
+    """Rough value of spending a search on this meme: KYM activity, recency and token matches."""
+    now = now or datetime.utcnow()
+    value = 0.0
+
+    def stat(key):
+        try:
+            return max(float(str(meme.get(key, 0)).replace(',', '')), 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    value += math.log10(1 + stat('views'))
+    value += 0.5 * math.log10(1 + stat('comments_count') + stat('videos_count') + stat('images_count'))
+
+    added = meme.get('added') or meme.get('last_updated')
+    if added:
+        for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+            try:
+                age_days = (now - datetime.strptime(str(added).replace('Z', '')[:19], fmt)).days
+                if age_days <= 7:
+                    value += 4
+                elif age_days <= 30:
+                    value += 2
+                elif age_days <= 365:
+                    value += 1
+                break
+            except ValueError:
+                continue
+    elif str(meme.get('year', '')).isdigit() and int(meme['year']) >= now.year - 1:
+        value += 1
+
+    if meme.get('name', '').lower() in matched_names:
+        value += 5  # Already has a token riding it, so YouTube momentum is directly actionable
+    return value
+
+
+def plan_searches(memes: List[Dict], remaining_units: int, cost_per_meme: int,
+                  matched_names: Optional[Set[str]] = None, limit: Optional[int] = None,
+                  min_expected_value: float = 0.0,
+                  meme_cost: Optional[Callable[[Dict], int]] = None) -> List[Dict]:
+    """Pick the memes worth searching within the remaining quota, best expected value first.
+
+    meme_cost overrides the flat cost_per_meme, e.g. for memes that only need a cheap stats refresh.
+    """
+    matched_names = {name.lower() for name in (matched_names or set())}
+    scored = [(meme_expected_value(meme, matched_names), index, meme)
+              for index, meme in enumerate(memes) if meme.get('name')]
+    scored = [entry for entry in scored if entry[0] >= min_expected_value]
+    scored.sort(key=lambda entry: (-entry[0], entry[1]))
+
+    selected = []
+    budget = max(0, remaining_units)
+    for _, _, meme in scored:
+        if limit is not None and len(selected) >= limit:
+            break
+        cost = meme_cost(meme) if meme_cost else cost_per_meme
+        if cost > budget:
+            continue
+        budget -= cost
+        selected.append(meme)
+    return selected
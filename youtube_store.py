@@ -0,0 +1,204 @@
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class VideoIndex:
+    """Video IDs found per meme, so view counts can be refreshed without a new search."""
+
+    def __init__(self, file_path: str, max_ids_per_meme: int = 200):
+        self.file_path = file_path
+        self.max_ids_per_meme = max_ids_per_meme
+        self._lock = threading.Lock()
+        self.memes: Dict[str, Dict] = {}
+        self.load()
+
+    @staticmethod
+    def key(meme_name: str) -> str:
+        return meme_name.strip().lower()
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self.memes = json.load(f).get('memes', {})
+        except Exception as e:
+            print(f"Error loading video index: {str(e)}")
+            self.memes = {}
+
+    def save(self):
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+                tmp_path = f"{self.file_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'memes': self.memes}, f)
+                os.replace(tmp_path, self.file_path)
+            except Exception as e:
+                print(f"Error saving video index: {str(e)}")
+
+    def video_ids(self, meme_name: str) -> List[str]:
+        entry = self.memes.get(self.key(meme_name))
+        return list(entry['video_ids']) if entry else []
+
+    def needs_search(self, meme_name: str, interval_hours: float) -> bool:
+        """True when we know no videos for the meme or its last full search is older than the interval."""
+        entry = self.memes.get(self.key(meme_name))
+        if not entry or not entry.get('video_ids'):
+            return True
+        return time.time() - entry.get('last_search', 0) > interval_hours * 3600
+
+    def record_search(self, meme_name: str, search_term: str, video_ids: List[str]):
+        """Merge newly discovered IDs ahead of the known ones."""
+        with self._lock:
+            entry = self.memes.setdefault(self.key(meme_name), {'video_ids': []})
+            merged = list(dict.fromkeys(video_ids + entry['video_ids']))
+            entry.update({
+                'search_term': search_term,
+                'video_ids': merged[:self.max_ids_per_meme],
+                'last_search': time.time()
+            })
+
+    def record_refresh(self, meme_name: str, live_ids: Optional[List[str]] = None):
+        """Note a stats-only refresh, dropping IDs YouTube no longer returns (deleted/private)."""
+        with self._lock:
+            entry = self.memes.get(self.key(meme_name))
+            if not entry:
+                return
+            if live_ids is not None:
+                live = set(live_ids)
+                entry['video_ids'] = [v for v in entry['video_ids'] if v in live]
+            entry['last_refresh'] = time.time()
+
+
+class SnapshotStore:
+    """Append-only log of (time, video ID, view count) samples taken every time a video is polled.
+
+    Each line is "unix_ts<TAB>video_id<TAB>views", so appends are cheap and the file is easy to
+    compact or ship. Only the few samples velocity() needs are kept per video in memory (the newest
+    one in each of the last RETAIN_HOURS hours and RETAIN_DAYS days polled), and save() rewrites
+    the log down to those samples.
+    """
+    # Three hour buckets put a sample at least an hour before the latest one; four day buckets do
+    # the same for the day rate and for the previous day's rate behind it (acceleration)
+    RETAIN_HOURS = 3
+    RETAIN_DAYS = 4
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.history: Optional[Dict[str, List[Tuple[int, int]]]] = None
+
+    @classmethod
+    def _retain(cls, samples: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Newest sample per bucket for the most recent hour and day buckets, oldest first."""
+        keep = set()
+        for bucket_seconds, buckets in ((3600, cls.RETAIN_HOURS), (86400, cls.RETAIN_DAYS)):
+            seen = []
+            for sample in reversed(samples):
+                bucket = sample[0] // bucket_seconds
+                if bucket in seen:
+                    continue
+                if len(seen) == buckets:
+                    break
+                seen.append(bucket)
+                keep.add(sample)
+        return sorted(keep)
+
+    def _add(self, history: Dict[str, List[Tuple[int, int]]], video_id: str, ts: int, views: int):
+        samples = history.setdefault(video_id, [])
+        bisect.insort(samples, (ts, views))
+        if len(samples) > self.RETAIN_HOURS + self.RETAIN_DAYS:
+            history[video_id] = self._retain(samples)
+
+    def _load(self) -> Dict[str, List[Tuple[int, int]]]:
+        if self.history is not None:
+            return self.history
+        history: Dict[str, List[Tuple[int, int]]] = {}
+        if os.path.exists(self.file_path):
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        ts, video_id, views = line.rstrip('\n').split('\t')
+                        self._add(history, video_id, int(ts), int(views))
+                    except ValueError:
+                        continue  # Torn final line from an interrupted append
+        self.history = {video_id: self._retain(samples) for video_id, samples in history.items()}
+        return self.history
+
+    def record(self, videos: List[Dict], ts: Optional[int] = None):
+        """Append one sample per video dict ({'video_id', 'views'})."""
+        ts = int(ts if ts is not None else time.time())
+        lines = [f"{ts}\t{video['video_id']}\t{int(video.get('views', 0))}\n"
+                 for video in videos if video.get('video_id')]
+        if not lines:
+            return
+        with self._lock:
+            history = self._load()
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+            for video in videos:
+                if video.get('video_id'):
+                    self._add(history, video['video_id'], ts, int(video.get('views', 0)))
+
+    def save(self):
+        """Compact the log to the retained samples."""
+        with self._lock:
+            if self.history is None:
+                return  # Nothing recorded or read this run; leave the log as it is
+            try:
+                history = {video_id: self._retain(samples) for video_id, samples in self.history.items()}
+                self.history = history
+                rows = sorted((ts, video_id, views) for video_id, samples in history.items()
+                              for ts, views in samples)
+                tmp_path = f"{self.file_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(f"{ts}\t{video_id}\t{views}\n" for ts, video_id, views in rows)
+                os.replace(tmp_path, self.file_path)
+            except Exception as e:
+                print(f"Error saving view snapshots: {str(e)}")
+
+    def samples(self, video_id: str) -> List[Tuple[int, int]]:
+        return list(self._load().get(video_id, []))
+
+    @staticmethod
+    def _rate(samples: List[Tuple[int, int]], end: int, window: int) -> Optional[float]:
+        """Views per second between the last sample at or before `end` and the one `window` earlier."""
+        upto = [s for s in samples if s[0] <= end]
+        if len(upto) < 2:
+            return None
+        t1, v1 = upto[-1]
+        earlier = [s for s in upto[:-1] if s[0] <= t1 - window]
+        t0, v0 = earlier[-1] if earlier else upto[0]
+        if t1 <= t0:
+            return None
+        return max(0, v1 - v0) / (t1 - t0)
+
+    def velocity(self, video_ids: List[str], now: Optional[int] = None) -> Dict[str, Any]:
+        """Measured view velocity and acceleration summed over a meme's videos."""
+        now = int(now if now is not None else time.time())
+        per_hour = per_day = acceleration = 0.0
+        measured = 0
+        for video_id in video_ids:
+            samples = self._load().get(video_id, [])
+            day_rate = self._rate(samples, now, 86400)
+            if day_rate is None:
+                continue
+            measured += 1
+            per_hour += (self._rate(samples, now, 3600) or 0.0) * 3600
+            per_day += day_rate * 86400
+            last_ts = [s[0] for s in samples if s[0] <= now][-1]
+            previous_rate = self._rate(samples, last_ts - 86400, 86400)
+            if previous_rate is not None:
+                acceleration += (day_rate - previous_rate) * 86400
+        return {
+            'videos_measured': measured,
+            'views_per_hour': round(per_hour, 1),
+            'views_per_day': round(per_day, 1),
+            'acceleration_per_day': round(acceleration, 1)
+        }
@@ -1,35 +1,168 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterator, Tuple, Optional, Set, Callable
 import json
+import os
+import sys
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from googleapiclient.discovery import build
 import re
+from bisect import bisect_right
 from collections import Counter
-import numpy as np
+from youtube_quota import QuotaLedger, plan_searches
+from youtube_store import VideoIndex, SnapshotStore
+from profiling import StageProfiler
+PLATFORM_KEYWORDS = {
+    'tiktok': ['#tiktok', ' tt ', 'douyin'],
+    'youtube': ['youtube shorts', '#shorts', '#youtube'],
+    'instagram': ['#instagram', '#reels', ' ig '],
+    'twitter': ['#twitter', '#tweet', 'x.com'],
+    'facebook': ['#facebook', '#fb', '#meta']
+}
+class PlatformMatcher:
+    """All platform keywords compiled into one regex, matching whole title lists in a single scan.
+
+    Only the longest keyword matching at a position is reported, so a keyword may not be a prefix
+    of another platform's keyword (both would start at the same offset and one platform would be
+    lost); the constructor rejects such lists.
+    """
+    SEPARATOR = '\x00'
+    def __init__(self, platform_keywords: Dict[str, List[str]]):
+        self.keyword_platform = {}
+        for platform, keywords in platform_keywords.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if self.keyword_platform.get(keyword, platform) != platform:
+                    raise ValueError(f"Keyword {keyword!r} is listed for both "
+                                     f"{self.keyword_platform[keyword]} and {platform}")
+                self.keyword_platform[keyword] = platform
+        for keyword, platform in self.keyword_platform.items():
+            for other, other_platform in self.keyword_platform.items():
+                if other_platform != platform and other != keyword and other.startswith(keyword):
+                    raise ValueError(f"Keyword {keyword!r} ({platform}) is a prefix of {other!r} "
+                                     f"({other_platform}); a single scan cannot report both")
+        alternation = '|'.join(re.escape(keyword) for keyword in
+                               sorted(self.keyword_platform, key=len, reverse=True))
+        # Zero-width lookahead so overlapping keywords (e.g. " tt " then " ig ") all match
+        self.pattern = re.compile(f"(?=({alternation}))")
+    def classify(self, titles: List[str]) -> List[set]:
+        """Platforms mentioned by each title (titles are padded with spaces like ' title ')."""
+        padded = [f" {title.lower()} " for title in titles]
+        starts = []
+        offset = 0
+        for text in padded:
+            starts.append(offset)
+            offset += len(text) + 1
+        
+        detected = [set() for _ in titles]
+        for match in self.pattern.finditer(self.SEPARATOR.join(padded)):
+            detected[bisect_right(starts, match.start()) - 1].add(self.keyword_platform[match.group(1)])
+        return detected
+    def count(self, titles: List[str]) -> Counter:
+        """Number of titles mentioning each platform."""
+        counts = Counter()
+        for platforms in self.classify(titles):
+            counts.update(platforms)
+        return counts
+PLATFORM_MATCHER = PlatformMatcher(PLATFORM_KEYWORDS)
 class YoutubeMemeChecker:
-    def __init__(self, api_key: str):
-        """Initialize with YouTube API key."""
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
+    def __init__(self, api_key: str, ledger_path: Optional[str] = None,
+                 video_index_path: Optional[str] = None, discovery_path: Optional[str] = None,
+                 client_factory: Optional[Callable[[], Any]] = None,
+                 snapshot_path: Optional[str] = None):
+        """Initialize with YouTube API key, a persistent daily quota ledger and the known-video index.
+
+        The API client is built lazily from a static discovery document (discovery_path if it
+        exists, otherwise the one bundled with googleapiclient), so no network round-trip happens
+        at startup. client_factory replaces the Google client entirely, e.g. with a local fake.
+        """
+        self.api_key = api_key
+        self.discovery_path = discovery_path
+        self.client_factory = client_factory
+        self._youtube = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
         self.api_calls = {
             'search': {'cost': 100, 'count': 0},
             'videos': {'cost': 1, 'count': 0},
             'total_quota': 0
         }
         self.DAILY_QUOTA = 10000
+        if ledger_path is None:
+            ledger_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_quota_ledger.json")
+        self.ledger = QuotaLedger(ledger_path)
+        if video_index_path is None:
+            video_index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_video_index.json")
+        self.video_index = VideoIndex(video_index_path)
+        # In refresh mode a meme is fully re-searched (100 units) only this often;
+        # in between its known videos are refreshed via videos().list (1 unit per 50 IDs)
+        self.full_search_interval_hours = 72
+        # Streaming runs save the video index every this many written results (and on exit),
+        # so a crash does not cost the searches already made
+        self.index_save_every = 25
+        if snapshot_path is None:
+            snapshot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_view_snapshots.tsv")
+        self.snapshots = SnapshotStore(snapshot_path)
+        # Set once the API reports quotaExceeded, so streaming runs stop instead of
+        # recording every remaining meme as having no videos
+        self.quota_exhausted = False
+        # Memes whose last search or refresh raised; like quota exhaustion that is not a
+        # "no videos" answer, so streaming runs leave them out of the file to retry on resume
+        self.failed_memes: Set[str] = set()
+    def _note_api_error(self, error: Exception):
+        if 'quotaExceeded' in str(error) or 'dailyLimitExceeded' in str(error):
+            self.quota_exhausted = True
+    def _build_client(self):
+        if self.client_factory:
+            return self.client_factory()
+        from googleapiclient.discovery import build, build_from_document
+        if self.discovery_path and os.path.exists(self.discovery_path):
+            with open(self.discovery_path, 'r', encoding='utf-8') as f:
+                return build_from_document(f.read(), developerKey=self.api_key)
+        return build('youtube', 'v3', developerKey=self.api_key,
+                     static_discovery=True, cache_discovery=False)
+    @property
+    def youtube(self):
+        if self._youtube is None:
+            self._youtube = self._build_client()
+        return self._youtube
+    @youtube.setter
+    def youtube(self, client):
+        self._youtube = client
+    def _client(self):
+        """YouTube client for the calling thread (the underlying httplib2 is not thread-safe)."""
+        if threading.current_thread() is threading.main_thread():
+            return self.youtube
+        client = getattr(self._local, 'youtube', None)
+        if client is None:
+            client = self._build_client()
+            self._local.youtube = client
+        return client
+    def _count_call(self, endpoint: str, units: int):
+        with self._lock:
+            self.api_calls[endpoint]['count'] += 1
+            self.api_calls['total_quota'] += units
+        self.ledger.charge(endpoint, units)
+    def estimated_cost_per_meme(self) -> int:
+        """Search cost plus the observed detail-call cost per search (one call until we have data)."""
+        today = self.ledger.today()
+        searches = today.get('search_calls', 0)
+        video_units = today.get('videos_units', 0)
+        avg_video_units = round(video_units / searches) if searches else self.api_calls['videos']['cost']
+        return self.api_calls['search']['cost'] + avg_video_units
     def get_quota_status(self) -> Dict[str, Any]:
         """Calculate remaining API quota and estimated costs."""
-        total_used = self.api_calls['total_quota']
-        remaining = self.DAILY_QUOTA - total_used
-        
-        estimated_cost_per_meme = (
-            100 +  
-            1 * 50  
+        total_used = self.ledger.used_today()
+        remaining = max(0, self.DAILY_QUOTA - total_used)
         
+        estimated_cost_per_meme = self.estimated_cost_per_meme()
         remaining_memes = remaining // estimated_cost_per_meme
         
         return {
             'quota_used': total_used,
             'quota_remaining': remaining,
             'estimated_memes_remaining': remaining_memes,
+            'session_quota_used': self.api_calls['total_quota'],
             'calls_made': {
                 'search_calls': self.api_calls['search']['count'],
                 'video_detail_calls': self.api_calls['videos']['count']
@@ -58,35 +191,19 @@ class YoutubeMemeChecker:
             cleaned += ' ' + ' '.join(relevant_hashtags)
             
         return cleaned
-    def search_youtube(self, search_term: str, max_results: int = 50) -> Tuple[List[Dict], Dict[str, Any]]:
-        """Search YouTube with quota tracking."""
-        try:
-            self.api_calls['search']['count'] += 1
-            self.api_calls['total_quota'] += self.api_calls['search']['cost']
-            
-            search_response = self.youtube.search().list(
-                q=search_term,
-                part='id,snippet',
-                type='video',
-                order='relevance',
-                maxResults=max_results,
-                publishedAfter=(datetime.utcnow() - timedelta(days=365)).isoformat() + 'Z'
-            ).execute()
+    def fetch_video_stats(self, video_ids: List[str]) -> List[Dict]:
+        """Fetch statistics for known video IDs, 50 per call (1 quota unit per call)."""
+        results = []
+        for i in range(0, len(video_ids), 50):
+            batch = video_ids[i:i + 50]
+            self._count_call('videos', self.api_calls['videos']['cost'])
             
-            video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
-            
-            if not video_ids:
-                return [], self.get_quota_status()
-            
-            self.api_calls['videos']['count'] += 1
-            self.api_calls['total_quota'] += len(video_ids) * self.api_calls['videos']['cost']
-            
-            videos_response = self.youtube.videos().list(
+            videos_response = self._client().videos().list(
                 part='statistics,snippet',
-                id=','.join(video_ids)
+                id=','.join(batch),
+                maxResults=50
             ).execute()
             
-            results = []
             for video in videos_response.get('items', []):
                 stats = video['statistics']
                 results.append({
@@ -97,103 +214,143 @@ class YoutubeMemeChecker:
                     'comments': int(stats.get('commentCount', 0)),
                     'published_at': video['snippet']['publishedAt']
                 })
+        
+        self.snapshots.record(results)
+        return sorted(results, key=lambda x: x['views'], reverse=True)
+    def search_youtube(self, search_term: str, max_results: int = 50,
+                       meme_name: Optional[str] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+        """Search YouTube with quota tracking, remembering the video IDs found for meme_name."""
+        try:
+            self._count_call('search', self.api_calls['search']['cost'])
+            
+            search_response = self._client().search().list(
+                q=search_term,
+                part='id,snippet',
+                type='video',
+                order='relevance',
+                maxResults=max_results,
+                publishedAfter=(datetime.utcnow() - timedelta(days=365)).isoformat() + 'Z'
+            ).execute()
+            
+            video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
             
-            return sorted(results, key=lambda x: x['views'], reverse=True), self.get_quota_status()
+            if meme_name:
+                self.video_index.record_search(meme_name, search_term, video_ids)
+            
+            results = self.fetch_video_stats(video_ids) if video_ids else []
+            self.failed_memes.discard(meme_name)
+            return results, self.get_quota_status()
             
         except Exception as e:
             print(f"Error searching YouTube for {search_term}: {str(e)}")
+            self._note_api_error(e)
+            if meme_name:
+                self.failed_memes.add(meme_name)
             return [], self.get_quota_status()
-    def analyze_virality(self, videos: List[Dict]) -> Dict[str, Any]:
+    def refresh_youtube(self, meme_name: str) -> Tuple[List[Dict], Dict[str, Any]]:
+        """Re-query view counts for a meme's known videos without a new search."""
+        try:
+            results = self.fetch_video_stats(self.video_index.video_ids(meme_name))
+            self.video_index.record_refresh(meme_name, [video['video_id'] for video in results])
+            self.failed_memes.discard(meme_name)
+            return results, self.get_quota_status()
+            
+        except Exception as e:
+            print(f"Error refreshing YouTube stats for {meme_name}: {str(e)}")
+            self._note_api_error(e)
+            self.failed_memes.add(meme_name)
+            return [], self.get_quota_status()
+    def uses_refresh(self, meme_name: str) -> bool:
+        return not self.video_index.needs_search(meme_name, self.full_search_interval_hours)
+    def estimated_meme_cost(self, meme: Dict, refresh: bool) -> int:
+        """Quota units a meme will cost: a stats-only refresh or a full search."""
+        meme_name = meme.get('name', '')
+        if refresh and self.uses_refresh(meme_name):
+            known = len(self.video_index.video_ids(meme_name))
+            return max(1, -(-known // 50)) * self.api_calls['videos']['cost']
+        return self.estimated_cost_per_meme()
+    def video_frame(self, videos: List[Dict]) -> Dict[str, Any]:
+        """Parse publish dates once into age/view arrays shared by both analyses.
+
+        Videos with an unparseable date are dropped (the timeline analysis always skipped them).
+        """
+        import numpy as np
+        
+        published = []
+        valid = []
+        for video in videos:
+            try:
+                published.append(np.datetime64(str(video['published_at']).rstrip('Z'), 's'))
+                valid.append(True)
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"Error processing video date: {e}")
+                published.append(np.datetime64('NaT'))
+                valid.append(False)
+        
+        valid = np.array(valid, dtype=bool)
+        published = np.array(published, dtype='datetime64[s]')[valid]
+        now = np.datetime64(datetime.utcnow().replace(microsecond=0), 's')
+        # Whole days, floored like timedelta.days
+        age_days = (now - published).astype(np.int64) // 86400
+        views = np.array([int(v.get('views', 0)) for v in videos], dtype=np.int64)[valid]
+        daily_views = np.where(age_days > 0, views / np.maximum(1, age_days), views).astype(float)
+        
+        return {
+            'index': np.flatnonzero(valid),
+            'published': published,
+            'age_days': age_days,
+            'views': views,
+            'daily_views': daily_views
+        }
+    def analyze_virality(self, videos: List[Dict], frame: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Enhanced video analysis with better growth metrics and recent video indicators."""
         if not videos:
             return {}
-
-        current_time = datetime.utcnow()
-        
-        # Initialize metrics
-        detailed_videos = []
-        recent_videos = []
-        platforms_mentioned = Counter()
-        
-        time_periods = {
-            'last_day': {'videos': [], 'views': 0},
-            'last_week': {'videos': [], 'views': 0},
-            'last_month': {'videos': [], 'views': 0},
-            'previous_week': {'videos': [], 'views': 0}
-        }
+        import numpy as np
+        if frame is None:
+            frame = self.video_frame(videos)
         
-        for video in videos:
-            publish_date = datetime.strptime(video['published_at'], '%Y-%m-%dT%H:%M:%SZ')
-            age_days = (current_time - publish_date).days
-            views = int(video.get('views', 0))
-            likes = int(video.get('likes', 0))
-            comments = int(video.get('comments', 0))
-            title = video['title'].lower()
-            
-            daily_views = views / max(1, age_days) if age_days > 0 else views
-            
-            video_info = {
+        age = frame['age_days']
+        views = frame['views']
+        daily_views = frame['daily_views']
+        
+        def video_info(row: int) -> Dict[str, Any]:
+            video = videos[frame['index'][row]]
+            return {
                 'title': video['title'],
-                'views': views,
-                'daily_views': daily_views,
+                'views': int(views[row]),
+                'daily_views': float(daily_views[row]),
                 'url': f"https://youtube.com/watch?v={video['video_id']}",
-                'age_days': age_days,
-                'publish_date': publish_date,
-                'is_recent': age_days <= 7  # Flag for videos in last 7 days
+                'age_days': int(age[row]),
+                'publish_date': frame['published'][row].item(),
+                'is_recent': bool(age[row] <= 7)  # Flag for videos in last 7 days
             }
-            
-            if age_days <= 1:
-                time_periods['last_day']['videos'].append(video_info)
-                time_periods['last_day']['views'] += views
-                
-            if age_days <= 7:
-                time_periods['last_week']['videos'].append(video_info)
-                time_periods['last_week']['views'] += views
-                
-            elif age_days <= 14:  # Previous week (7-14 days ago)
-                time_periods['previous_week']['videos'].append(video_info)
-                time_periods['previous_week']['views'] += views
-                
-            if age_days <= 30:
-                time_periods['last_month']['videos'].append(video_info)
-                time_periods['last_month']['views'] += views
-                recent_videos.append(video_info)
-                
-            # Platform detection with improved accuracy
-            detected_platforms = set()
-            platform_keywords = {
-                'tiktok': ['#tiktok', ' tt ', 'douyin'],
-                'youtube': ['youtube shorts', '#shorts', '#youtube'],
-                'instagram': ['#instagram', '#reels', ' ig '],
-                'twitter': ['#twitter', '#tweet', 'x.com'],
-                'facebook': ['#facebook', '#fb', '#meta']
-            }
-            
-            for platform, keywords in platform_keywords.items():
-                if any(keyword in f" {title} " for keyword in keywords):
-                    detected_platforms.add(platform)
-                    platforms_mentioned[platform] += 1
-            
-            detailed_videos.append(video_info)
         
-        detailed_videos.sort(key=lambda x: x['views'], reverse=True)
-        recent_videos.sort(key=lambda x: x['views'], reverse=True)
+        by_views = np.argsort(-views, kind='stable')
+        last_day = age <= 1
+        last_week = age <= 7
+        previous_week = (age > 7) & (age <= 14)
+        last_month = age <= 30
+        
+        # Platform detection with improved accuracy
+        platforms_mentioned = PLATFORM_MATCHER.count([videos[index]['title'] for index in frame['index']])
         
-        this_week_views = time_periods['last_week']['views']
-        prev_week_views = time_periods['previous_week']['views']
+        this_week_views = int(views[last_week].sum())
+        prev_week_views = int(views[previous_week].sum())
         
         if prev_week_views > 0:
             weekly_growth = ((this_week_views - prev_week_views) / prev_week_views) * 100
         else:
             weekly_growth = 100 if this_week_views > 0 else 0
         
-        view_rates = [v['daily_views'] for v in detailed_videos if v['daily_views'] > 0]
+        view_rates = daily_views[daily_views > 0]
         viral_threshold = (
-            max(50000, np.percentile(view_rates, 90))
-            if view_rates else 50000
+            max(50000, float(np.percentile(view_rates, 90)))
+            if view_rates.size else 50000
         )
         
-        viral_videos = [v for v in detailed_videos if v['daily_views'] > viral_threshold]
+        viral_rows = by_views[daily_views[by_views] > viral_threshold]
+        recent_rows = by_views[last_month[by_views]]
         
         trending_score = 0
         
@@ -201,17 +358,17 @@ class YoutubeMemeChecker:
         elif weekly_growth > 100: trending_score += 2
         elif weekly_growth > 50: trending_score += 1
         
-        recent_count = len(time_periods['last_week']['videos'])
+        recent_count = int(last_week.sum())
         if recent_count >= 10: trending_score += 3
         elif recent_count >= 5: trending_score += 2
         elif recent_count >= 2: trending_score += 1
         
-        if len(viral_videos) >= 3: trending_score += 4
-        elif len(viral_videos) >= 1: trending_score += 2
+        if len(viral_rows) >= 3: trending_score += 4
+        elif len(viral_rows) >= 1: trending_score += 2
 
         return {
-            'videos': detailed_videos[:10],
-            'recent_videos': recent_videos[:5],
+            'videos': [video_info(row) for row in by_views[:10]],
+            'recent_videos': [video_info(row) for row in recent_rows[:5]],
             'stats': {
                 'week_views': this_week_views,
                 'prev_week_views': prev_week_views,
@@ -220,20 +377,20 @@ class YoutubeMemeChecker:
                 'viral_threshold': viral_threshold,
                 'trending_score': trending_score,
                 'video_counts': {
-                    'last_day': len(time_periods['last_day']['videos']),
-                    'last_week': len(time_periods['last_week']['videos']),
-                    'last_month': len(time_periods['last_month']['videos'])
+                    'last_day': int(last_day.sum()),
+                    'last_week': recent_count,
+                    'last_month': int(last_month.sum())
                 }
             },
             'platforms': dict(platforms_mentioned),
             'viral_videos': [{
-                'title': v['title'],
-                'views': v['views'],
-                'daily_views': v['daily_views'],
-                'url': v['url']
-            } for v in viral_videos[:5]]
+                'title': info['title'],
+                'views': info['views'],
+                'daily_views': info['daily_views'],
+                'url': info['url']
+            } for info in map(video_info, viral_rows[:5])]
         }
-    def analyze_video_timeline(self, videos: List[Dict]) -> Dict[str, Any]:
+    def analyze_video_timeline(self, videos: List[Dict], frame: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if not videos:
             return {
                 'timeline': {
@@ -249,45 +406,22 @@ class YoutubeMemeChecker:
                 'trend_factors': [],
                 'is_trending': False
             }
-            
-        current_time = datetime.utcnow()
+        if frame is None:
+            frame = self.video_frame(videos)
+        
+        age = frame['age_days']
+        views = frame['views']
         
         timeline = {
-            'last_day': 0,
-            'last_week': 0,
-            'last_month': 0,
-            'last_3_months': 0,
-            'last_year': 0
+            'last_day': int((age <= 1).sum()),
+            'last_week': int((age <= 7).sum()),
+            'last_month': int((age <= 30).sum()),
+            'last_3_months': int((age <= 90).sum()),
+            'last_year': int((age <= 365).sum())
         }
         
-        total_views = 0
-        recent_views = 0  
-        
-        for video in videos:
-            try:
-                publish_date = datetime.strptime(video['published_at'], '%Y-%m-%dT%H:%M:%SZ')
-                days_ago = (current_time - publish_date).days
-                views = int(video.get('views', 0))
-                
-                total_views += views
-                
-                if days_ago <= 30:
-                    recent_views += views
-                
-                if days_ago <= 1:
-                    timeline['last_day'] += 1
-                if days_ago <= 7:
-                    timeline['last_week'] += 1
-                if days_ago <= 30:
-                    timeline['last_month'] += 1
-                if days_ago <= 90:
-                    timeline['last_3_months'] += 1
-                if days_ago <= 365:
-                    timeline['last_year'] += 1
-                    
-            except (ValueError, TypeError) as e:
-                print(f"Error processing video date: {e}")
-                continue
+        total_views = int(views.sum())
+        recent_views = int(views[age <= 30].sum())
         
         trend_score = 0
         trend_factors = []
@@ -328,8 +462,197 @@ class YoutubeMemeChecker:
             'trend_factors': trend_factors,
             'is_trending': trend_score >= 5
     }
-    def process_meme_file(self, json_file_path: str, limit: int = 10) -> Dict[str, Any]:
-        """Process memes from JSON file and analyze YouTube trends."""
+    def analyze_velocity(self, meme_name: str) -> Dict[str, Any]:
+        """Trend points from measured view velocity in the snapshot store (no API calls)."""
+        velocity = self.snapshots.velocity(self.video_index.video_ids(meme_name))
+        score = 0
+        factors = []
+        
+        if velocity['videos_measured']:
+            if velocity['views_per_day'] > 1000000:
+                score += 3
+                factors.append('Very high measured view velocity')
+            elif velocity['views_per_day'] > 100000:
+                score += 2
+                factors.append('High measured view velocity')
+            elif velocity['views_per_day'] > 10000:
+                score += 1
+                factors.append('Moderate measured view velocity')
+            
+            if velocity['acceleration_per_day'] > 0.25 * velocity['views_per_day'] > 0:
+                score += 2
+                factors.append('Accelerating views')
+            elif velocity['acceleration_per_day'] > 0:
+                score += 1
+                factors.append('Views still speeding up')
+        
+        return dict(velocity, velocity_score=score, velocity_factors=factors)
+    def rederive_trends(self, meme_names: List[str]) -> List[Dict[str, Any]]:
+        """Re-rank memes by measured velocity from stored snapshots, spending no quota."""
+        trends = [dict(self.analyze_velocity(name), meme_name=name) for name in meme_names]
+        return sorted(trends, key=lambda x: (x['velocity_score'], x['views_per_day']), reverse=True)
+    def process_meme(self, meme: Dict, position: int, total: int, refresh: bool = False) -> Optional[Dict]:
+        """Search (or, in refresh mode, re-poll) and analyze a single meme; None when nothing was found."""
+        meme_name = meme.get('name', '')
+        if not meme_name:
+            return None
+        
+        print(f"Processing meme {position}/{total}: {meme_name}")
+        
+        search_term = self.clean_search_term(meme_name)
+        if refresh and self.uses_refresh(meme_name):
+            youtube_results, quota_status = self.refresh_youtube(meme_name)
+        else:
+            youtube_results, quota_status = self.search_youtube(search_term, meme_name=meme_name)
+        
+        if not youtube_results:
+            return None
+            
+        frame = self.video_frame(youtube_results)
+        trend_analysis = self.analyze_video_timeline(youtube_results, frame)
+        virality_metrics = self.analyze_virality(youtube_results, frame)
+        velocity = self.analyze_velocity(meme_name)
+        trend_score = trend_analysis['trend_score'] + velocity['velocity_score']
+        
+        return {
+            'meme_name': meme_name,
+            'youtube_metrics': {
+                'total_videos': len(youtube_results),
+                'total_views': trend_analysis['total_views'],
+                'recent_views': trend_analysis['recent_views'],
+                'timeline': trend_analysis['timeline'],
+                'trend_score': trend_score,
+                'trend_factors': trend_analysis['trend_factors'] + velocity['velocity_factors'],
+                'is_trending': trend_score >= 5,
+                'velocity': velocity,
+                'virality': virality_metrics,
+                'top_videos': youtube_results[:5]
+            },
+            'original_url': meme.get('url', ''),
+            'year': meme.get('year', 'Unknown'),
+            'hashtags': self.extract_hashtags(meme_name)
+        }
+    def process_memes_concurrently(self, memes: List[Dict], total: int, workers: int,
+                                   max_in_flight: Optional[int] = None, refresh: bool = False,
+                                   on_result: Optional[Callable[[int, Optional[Dict]], None]] = None
+                                   ) -> List[Optional[Dict]]:
+        """Process memes on a thread pool, at most max_in_flight at a time, keeping input order.
+
+        With on_result, each result is handed over as soon as it completes (on the calling
+        thread) instead of being kept, and an empty list is returned.
+        """
+        max_in_flight = max_in_flight or workers * 2
+        results: List[Optional[Dict]] = [] if on_result else [None] * len(memes)
+        pending = {}
+        
+        def collect(future):
+            index = pending.pop(future)
+            if on_result:
+                on_result(index, future.result())
+            else:
+                results[index] = future.result()
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, meme in enumerate(memes):
+                if len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                if self.quota_exhausted:
+                    break
+                pending[executor.submit(self.process_meme, meme, index + 1, total, refresh)] = index
+                
+            for future in list(pending):
+                collect(future)
+        
+        return results
+    @staticmethod
+    def read_results(output_path: str) -> Iterator[Dict]:
+        """Records already streamed to output_path; torn or nameless lines are skipped."""
+        if not os.path.exists(output_path):
+            return
+        with open(output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash; that meme is redone
+                if isinstance(record, dict) and record.get('meme_name'):
+                    yield record
+    def stream_memes(self, memes: List[Dict], output_path: str, top_n: int = 50, workers: int = 1,
+                     max_in_flight: Optional[int] = None, refresh: bool = False) -> Tuple[List[Dict], int]:
+        """Append one NDJSON line per finished meme and keep only the top_n results in memory.
+
+        Memes already present in output_path are skipped, so an interrupted run resumes where it
+        stopped. Returns the top_n results (best first) and the number of memes in the file.
+        """
+        top: List[Tuple[Tuple, int, Dict]] = []
+        done_names = set()
+        sequence = 0
+        
+        def keep(result: Dict):
+            nonlocal sequence
+            sequence += 1
+            metrics = result['youtube_metrics']
+            entry = ((metrics['trend_score'], metrics['recent_views']), -sequence, result)
+            if len(top) < top_n:
+                heapq.heappush(top, entry)
+            elif entry[:2] > top[0][:2]:
+                heapq.heapreplace(top, entry)
+        
+        for record in self.read_results(output_path):
+            done_names.add(record['meme_name'])
+            if record.get('youtube_metrics'):
+                keep(record)
+        if done_names:
+            print(f"Resuming: {len(done_names)} memes already in {output_path}")
+        
+        todo = [meme for meme in memes if meme.get('name') and meme['name'] not in done_names]
+        
+        written = 0
+        with open(output_path, 'a', encoding='utf-8') as out:
+            def write(index: int, result: Optional[Dict]):
+                nonlocal written
+                if result is None and (self.quota_exhausted or todo[index]['name'] in self.failed_memes):
+                    return  # Not a real "no videos" answer; leave it for the next run
+                record = result or {'meme_name': todo[index]['name'], 'youtube_metrics': None}
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                out.flush()
+                done_names.add(record['meme_name'])
+                if result:
+                    keep(result)
+                written += 1
+                if written % self.index_save_every == 0:
+                    self.video_index.save()
+            
+            try:
+                if workers > 1:
+                    self.process_memes_concurrently(todo, len(todo), workers, max_in_flight, refresh,
+                                                    on_result=write)
+                else:
+                    for index, meme in enumerate(todo):
+                        if self.quota_exhausted:
+                            break
+                        write(index, self.process_meme(meme, index + 1, len(todo), refresh))
+            finally:
+                self.video_index.save()
+                self.snapshots.save()
+        
+        if self.quota_exhausted:
+            print("YouTube quota exhausted; re-run with the same output file to resume")
+        elif self.failed_memes:
+            print(f"{len(self.failed_memes)} memes failed; re-run with the same output file to retry them")
+        best = [entry[2] for entry in sorted(top, key=lambda entry: entry[:2], reverse=True)]
+        return best, len(done_names)
+    def process_meme_file(self, json_file_path: str, limit: int = 10, workers: int = 1,
+                          max_in_flight: Optional[int] = None, plan: bool = False,
+                          matched_names: Optional[Set[str]] = None, refresh: bool = False,
+                          output_path: Optional[str] = None, top_n: int = 50) -> Dict[str, Any]:
+        """Process memes from JSON file and analyze YouTube trends.
+
+        With output_path, results are streamed to that NDJSON file as they complete (and a
+        partial file is resumed); only the top_n memes are kept for the returned report.
+        """
         trending_memes = []
         processed_count = 0
         
@@ -338,38 +661,39 @@ class YoutubeMemeChecker:
                 data = json.load(file)
                 memes_data = data.get('memes', [])
             
-            for meme in memes_data[:limit]:
-                processed_count += 1
-                meme_name = meme.get('name', '')
-                if not meme_name:
-                    continue
-                
-                print(f"Processing meme {processed_count}/{limit}: {meme_name}")
-                
-                search_term = self.clean_search_term(meme_name)
-                youtube_results, quota_status = self.search_youtube(search_term)
-                
-                if youtube_results:
-                    trend_analysis = self.analyze_video_timeline(youtube_results)
-                    virality_metrics = self.analyze_virality(youtube_results)
-                    
-                    trending_memes.append({
-                        'meme_name': meme_name,
-                        'youtube_metrics': {
-                            'total_videos': len(youtube_results),
-                            'total_views': trend_analysis['total_views'],
-                            'recent_views': trend_analysis['recent_views'],
-                            'timeline': trend_analysis['timeline'],
-                            'trend_score': trend_analysis['trend_score'],
-                            'trend_factors': trend_analysis['trend_factors'],
-                            'is_trending': trend_analysis['is_trending'],
-                            'virality': virality_metrics,
-                            'top_videos': youtube_results[:5]
-                        },
-                        'original_url': meme.get('url', ''),
-                        'year': meme.get('year', 'Unknown'),
-                        'hashtags': self.extract_hashtags(meme_name)
-                    })
+            if plan and output_path:
+                # stream_memes skips memes already in the results file; plan only for the rest
+                done_names = {record['meme_name'] for record in self.read_results(output_path)}
+                memes_data = [meme for meme in memes_data if meme.get('name') not in done_names]
+            if plan:
+                # Spend searches only on the highest expected-value memes that fit today's quota
+                remaining = self.DAILY_QUOTA - self.ledger.used_today()
+                memes = plan_searches(memes_data, remaining, self.estimated_cost_per_meme(),
+                                      matched_names, limit,
+                                      meme_cost=lambda meme: self.estimated_meme_cost(meme, refresh))
+                print(f"Quota planner selected {len(memes)} of {len(memes_data)} memes "
+                      f"({remaining:,} units remaining today)")
+            else:
+                memes = memes_data[:limit]
+            if output_path:
+                trending_memes, processed_count = self.stream_memes(memes, output_path, top_n, workers,
+                                                                    max_in_flight, refresh)
+                return {
+                    'trending_memes': trending_memes,
+                    'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'memes_processed': processed_count,
+                    'quota_status': self.get_quota_status(),
+                    'results_file': output_path
+                }
+            if workers > 1:
+                results = self.process_memes_concurrently(memes, len(memes), workers, max_in_flight, refresh)
+            else:
+                results = [self.process_meme(meme, i + 1, len(memes), refresh) for i, meme in enumerate(memes)]
+            self.video_index.save()
+            self.snapshots.save()
+            
+            processed_count = len(memes)
+            trending_memes = [result for result in results if result]
         
         except Exception as e:
             print(f"Error processing file: {str(e)}")
@@ -390,6 +714,14 @@ class YoutubeMemeChecker:
             'quota_status': self.get_quota_status()
         }
 
+def save_discovery_document(file_path: str):
+    """Write the YouTube v3 discovery document bundled with googleapiclient for offline startup."""
+    from googleapiclient.discovery_cache import get_static_doc
+    document = get_static_doc('youtube', 'v3')
+    if not document:
+        raise RuntimeError("googleapiclient has no bundled youtube v3 discovery document")
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(document)
 def print_trend_report(report: Dict[str, Any]):
     print(f"\n=== YouTube Meme Trend Analysis ({report['analysis_date']}) ===")
     print(f"Memes Processed: {report['memes_processed']}")
@@ -440,6 +772,13 @@ def print_trend_report(report: Dict[str, Any]):
             print("\n   " + "="*50)
 if __name__ == "__main__":
     API_KEY = ''
+    profiler = StageProfiler('yt').start() if '--profile' in sys.argv[1:] else StageProfiler.disabled()
     checker = YoutubeMemeChecker(API_KEY)
-    report = checker.process_meme_file("", limit=1500)
-    print_trend_report(report)
+    try:
+        with profiler.stage('process_memes'):
+            report = checker.process_meme_file("", limit=1500, workers=8, plan=True, refresh=True,
+                                               output_path="youtube_trends.ndjson")
+        with profiler.stage('report'):
+            print_trend_report(report)
+    finally:
+        profiler.stop()